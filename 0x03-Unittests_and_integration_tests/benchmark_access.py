@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Benchmark access_nested_map against compile_path and extract.
+
+Scales the repos of fixtures.TEST_PAYLOAD up and times reading the
+name, license key and language of every repo.
+Usage: python benchmark_access.py [copies] [repeats]
+"""
+import sys
+import time
+from typing import Callable, List
+
+from fixtures import TEST_PAYLOAD
+from utils import access_nested_map, compile_path, extract
+
+PATHS = [("name",), ("license", "key"), ("language",)]
+
+
+def with_access_nested_map(repos: List) -> List:
+    """The baseline: access_nested_map per field, KeyError -> None"""
+    rows = []
+    for repo in repos:
+        row = []
+        for path in PATHS:
+            try:
+                row.append(access_nested_map(repo, path))
+            except KeyError:
+                row.append(None)
+        rows.append(tuple(row))
+    return rows
+
+
+def with_compile_path(repos: List) -> List:
+    """Accessors compiled once, applied per record"""
+    getters = [compile_path(path, default=None) for path in PATHS]
+    return [tuple([get(repo) for get in getters]) for repo in repos]
+
+
+def with_extract(repos: List) -> List:
+    """One extract call over every record"""
+    return extract(repos, PATHS, default=None)
+
+
+def best_of(function: Callable, repos: List, repeats: int) -> float:
+    """Best-of-``repeats`` time in milliseconds"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(repos)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    repos = TEST_PAYLOAD[0][1] * copies
+    expected = with_access_nested_map(repos)
+
+    print("{} repos, best of {}".format(len(repos), repeats))
+    baseline = None
+    for function in (with_access_nested_map, with_compile_path,
+                     with_extract):
+        assert function(repos) == expected
+        elapsed = best_of(function, repos, repeats)
+        baseline = baseline or elapsed
+        print("{:24} {:9.1f} ms  {:5.1f}x".format(
+            function.__name__, elapsed, baseline / elapsed))
+
+
+if __name__ == "__main__":
+    main()
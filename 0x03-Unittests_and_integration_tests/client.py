@@ -1,31 +1,104 @@
 #!/usr/bin/env python3
 """A github org client
 """
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from typing import (
+    Any,
     List,
     Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
 )
 
 from utils import (
     get_json,
-    access_nested_map,
+    get_json_page,
+    compile_path,
     memoize,
+    LRUCache,
+    POOL_MAXSIZE,
+    BULK,
+    request_priority,
 )
 
+_license_key = compile_path(("license", "key"), default=None)
+
+
+class RepoIndex:
+    """Index of a repos payload by facet value.
+    Built once per payload so filtered queries are dict lookups and
+    filters on several facets are set intersections. Names come back in
+    payload order.
+    """
+    FACETS = {
+        "license": ("license", "key"),
+        "language": ("language",),
+        "archived": ("archived",),
+        "fork": ("fork",),
+    }
+
+    def __init__(self, payload: Sequence[Dict]) -> None:
+        """Index payload by every facet"""
+        self.payload = payload
+        self.names = [repo["name"] for repo in payload]
+        self._index: Dict[str, Dict[Any, List[int]]] = {}
+        for facet, path in self.FACETS.items():
+            get = compile_path(path, default=None)
+            index = self._index[facet] = {}
+            for position, repo in enumerate(payload):
+                value = get(repo)
+                if value is not None:
+                    index.setdefault(value, []).append(position)
+
+    def values(self, facet: str) -> List[Any]:
+        """Distinct values seen for facet"""
+        return list(self._facet(facet))
+
+    def select(self, **facets: Any) -> List[str]:
+        """Names of the repos matching every ``facet=value`` given"""
+        if not facets:
+            return list(self.names)
+        matches = [self._facet(facet).get(value, ())
+                   for facet, value in facets.items()]
+        if len(matches) == 1:
+            return [self.names[position] for position in matches[0]]
+        positions = set(min(matches, key=len)).intersection(*matches)
+        return [self.names[position] for position in sorted(positions)]
+
+    def _facet(self, facet: str) -> Dict[Any, List[int]]:
+        """The value -> positions map of facet"""
+        try:
+            return self._index[facet]
+        except KeyError:
+            raise ValueError("Unknown facet: {!r}".format(facet)) from None
+
 
 class GithubOrgClient:
     """A Githib org client
     """
     ORG_URL = "https://api.github.com/orgs/{org}"
+    # Repo key paths iter_public_repos needs
+    REPO_FIELDS = (("name",), ("license", "key"))
+    # Payloads by URL, shared by every client in the process
+    payload_cache = LRUCache(maxsize=256, ttl=300)
 
     def __init__(self, org_name: str) -> None:
         """Init method of GithubOrgClient"""
         self._org_name = org_name
+        self._repo_index: Optional[RepoIndex] = None
+
+    def _get_json(self, url: str) -> Dict:
+        """get_json through the shared payload cache"""
+        return self.payload_cache.get_or_set(url, lambda: get_json(url))
 
     @memoize
     def org(self) -> Dict:
         """Memoize org"""
-        return get_json(self.ORG_URL.format(org=self._org_name))
+        return self._get_json(self.ORG_URL.format(org=self._org_name))
 
     @property
     def _public_repos_url(self) -> str:
@@ -35,24 +108,168 @@ class GithubOrgClient:
     @memoize
     def repos_payload(self) -> Dict:
         """Memoize repos payload"""
-        return get_json(self._public_repos_url)
+        return self._get_json(self._public_repos_url)
+
+    def refresh(self) -> None:
+        """Forget the org and repos payloads, here and in payload_cache"""
+        org_url = self.ORG_URL.format(org=self._org_name)
+        org = self.payload_cache.get(org_url)
+        if org is not None:
+            self.payload_cache.invalidate(org.get("repos_url"))
+        self.payload_cache.invalidate(org_url)
+        type(self).org.invalidate(self)
+        type(self).repos_payload.invalidate(self)
+
+    @property
+    def repo_index(self) -> RepoIndex:
+        """RepoIndex of repos_payload, rebuilt when the payload changes"""
+        payload = self.repos_payload
+        index = self._repo_index
+        if index is None or index.payload is not payload:
+            index = self._repo_index = RepoIndex(payload)
+        return index
 
-    def public_repos(self, license: str = None) -> List[str]:
-        """Public repos"""
-        json_payload = self.repos_payload
-        public_repos = [
-            repo["name"] for repo in json_payload
-            if license is None or self.has_license(repo, license)
-        ]
+    def public_repos(self, license: str = None, **facets: Any) -> List[str]:
+        """Public repos, optionally filtered by license and other facets
+        (see RepoIndex.FACETS), e.g. ``language="Python", fork=False``.
+        """
+        if license is not None:
+            facets["license"] = license
+        return self.repo_index.select(**facets)
 
-        return public_repos
+    def iter_public_repos(
+        self, license: str = None, prefetch: bool = False
+    ) -> Iterator[str]:
+        """Lazily yield public repo names across all pages.
+        Follows ``rel="next"`` links one page at a time; with ``prefetch``
+        the next page is fetched in the background while the current one
+        is consumed. At most two pages are held in memory, and only the
+        fields in REPO_FIELDS are parsed out of each repo.
+        """
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            page, next_url = get_json_page(self._public_repos_url,
+                                           fields=self.REPO_FIELDS)
+            while True:
+                pending = None
+                if executor is not None and next_url is not None:
+                    # Run in a copy of our context so request_priority
+                    # applies to prefetched pages too
+                    pending = executor.submit(
+                        contextvars.copy_context().run, get_json_page,
+                        next_url, fields=self.REPO_FIELDS
+                    )
+                for repo in page:
+                    if license is None or self.has_license(repo, license):
+                        yield repo["name"]
+                if next_url is None:
+                    return
+                if pending is not None:
+                    page, next_url = pending.result()
+                else:
+                    page, next_url = get_json_page(next_url,
+                                                   fields=self.REPO_FIELDS)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
 
     @staticmethod
     def has_license(repo: Dict[str, Dict], license_key: str) -> bool:
         """Static: has_license"""
         assert license_key is not None, "license_key cannot be None"
+        return _license_key(repo) == license_key
+
+
+class AsyncGithubOrgClient:
+    """An asyncio Github org client with the GithubOrgClient surface.
+    Requests run on worker threads over the pooled keep-alive session,
+    so many orgs can be fetched at once; ``semaphore`` bounds how many
+    requests are in flight.
+    """
+    ORG_URL = GithubOrgClient.ORG_URL
+    payload_cache = GithubOrgClient.payload_cache
+
+    def __init__(self, org_name: str,
+                 semaphore: Optional[asyncio.Semaphore] = None) -> None:
+        """Init method of AsyncGithubOrgClient"""
+        self._org_name = org_name
+        self._semaphore = semaphore
+        self._results: Dict[str, asyncio.Future] = {}
+        self._repo_index: Optional[RepoIndex] = None
+
+    async def _get_json(self, url: str) -> Dict:
+        """Fetch url off the event loop, under the semaphore if any"""
+        payload = self.payload_cache.get(url)
+        if payload is not None:
+            return payload
+        if self._semaphore is None:
+            payload = await asyncio.to_thread(get_json, url)
+        else:
+            async with self._semaphore:
+                payload = await asyncio.to_thread(get_json, url)
+        self.payload_cache.set(url, payload)
+        return payload
+
+    async def _once(self, name: str, fetch) -> Dict:
+        """Run fetch() once per client; concurrent callers share it"""
+        future = self._results.get(name)
+        if future is None:
+            future = asyncio.ensure_future(fetch())
+            self._results[name] = future
         try:
-            has_license = access_nested_map(repo, ("license", "key")) == license_key
-        except KeyError:
-            return False
-        return has_license
+            return await asyncio.shield(future)
+        except Exception:
+            # Don't memoize failures
+            if self._results.get(name) is future:
+                del self._results[name]
+            raise
+
+    async def org(self) -> Dict:
+        """Memoize org"""
+        url = self.ORG_URL.format(org=self._org_name)
+        return await self._once("org", lambda: self._get_json(url))
+
+    async def _public_repos_url(self) -> str:
+        """Public repos URL"""
+        return (await self.org())["repos_url"]
+
+    async def repos_payload(self) -> Dict:
+        """Memoize repos payload"""
+        async def fetch() -> Dict:
+            return await self._get_json(await self._public_repos_url())
+        return await self._once("repos_payload", fetch)
+
+    async def public_repos(self, license: str = None,
+                           **facets: Any) -> List[str]:
+        """Public repos, filtered like GithubOrgClient.public_repos"""
+        payload = await self.repos_payload()
+        index = self._repo_index
+        if index is None or index.payload is not payload:
+            index = self._repo_index = RepoIndex(payload)
+        if license is not None:
+            facets["license"] = license
+        return index.select(**facets)
+
+
+async def fetch_public_repos(
+    org_names: Iterable[str], license: str = None,
+    max_concurrency: int = POOL_MAXSIZE, return_exceptions: bool = False,
+    priority: int = BULK
+) -> Dict[str, List[str]]:
+    """Fetch public repos for many orgs concurrently.
+    At most ``max_concurrency`` requests are in flight at once, sent at
+    ``priority`` (BULK by default, so interactive callers go first when
+    a rate limiter is set). Returns a dict of org name -> repo names,
+    in the order given; with ``return_exceptions`` a failed org maps
+    to its exception instead.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    names = list(org_names)
+    with request_priority(priority):
+        # The tasks copy the current context, priority included
+        results = await asyncio.gather(
+            *(AsyncGithubOrgClient(name, semaphore).public_repos(license)
+              for name in names),
+            return_exceptions=return_exceptions
+        )
+    return dict(zip(names, results))
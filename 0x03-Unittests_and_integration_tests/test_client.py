@@ -1,14 +1,24 @@
 #!/usr/bin/env python3
 """Unit & integration tests for GithubOrgClient"""
 
+import asyncio
+import io
+import json
+import threading
 import unittest
 from unittest.mock import patch, PropertyMock, Mock
 from parameterized import parameterized, parameterized_class
 import sys
 import os
 
-from client import GithubOrgClient
+from client import (
+    AsyncGithubOrgClient,
+    GithubOrgClient,
+    RepoIndex,
+    fetch_public_repos,
+)
 from fixtures import TEST_PAYLOAD
+import utils
 
 # Ensure current dir is in sys.path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -17,6 +27,10 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 class TestGithubOrgClient(unittest.TestCase):
     """Unit tests for GithubOrgClient"""
 
+    def setUp(self):
+        """Start from an empty shared payload cache."""
+        GithubOrgClient.payload_cache.clear()
+
     @parameterized.expand([
         ("google", {"login": "google"}),
         ("abc", {"login": "abc"}),
@@ -34,6 +48,46 @@ class TestGithubOrgClient(unittest.TestCase):
             f"https://api.github.com/orgs/{org_name}"
         )
 
+    @patch("client.get_json")
+    def test_refresh(self, mock_get_json):
+        """Test that refresh makes org be fetched again."""
+        mock_get_json.side_effect = [{"login": "old"}, {"login": "new"}]
+        client = GithubOrgClient("google")
+
+        self.assertEqual(client.org, {"login": "old"})
+        self.assertEqual(client.org, {"login": "old"})
+        client.refresh()
+        self.assertEqual(client.org, {"login": "new"})
+        self.assertEqual(mock_get_json.call_count, 2)
+
+    @patch("client.get_json")
+    def test_payloads_shared_between_clients(self, mock_get_json):
+        """Test that clients for the same org share fetched payloads."""
+        mock_get_json.side_effect = [
+            {"repos_url": "https://api.github.com/orgs/google/repos"},
+            [{"name": "repo1"}],
+        ]
+
+        first = GithubOrgClient("google").public_repos()
+        second = GithubOrgClient("google").public_repos()
+
+        self.assertEqual(first, second)
+        self.assertEqual(mock_get_json.call_count, 2)
+        info = GithubOrgClient.payload_cache.cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (2, 2, 2))
+
+    def test_repo_index_follows_payload(self):
+        """Test that the index is reused, and rebuilt for a new payload."""
+        first = [{"name": "repo1", "license": {"key": "mit"}}]
+        second = [{"name": "repo2", "license": {"key": "mit"}}]
+        with patch.object(GithubOrgClient, "repos_payload",
+                          new_callable=PropertyMock,
+                          side_effect=[first, first, second]):
+            client = GithubOrgClient("google")
+            index = client.repo_index
+            self.assertIs(client.repo_index, index)
+            self.assertEqual(client.public_repos("mit"), ["repo2"])
+
     @patch.object(GithubOrgClient, "org", new_callable=PropertyMock)
     def test_public_repos_url(self, mock_org):
         """Test that _public_repos_url returns the correct URL."""
@@ -72,6 +126,51 @@ class TestGithubOrgClient(unittest.TestCase):
             mock_url.assert_called_once()
             mock_get_json.assert_called_once_with(test_url)
 
+    @parameterized.expand([
+        ("no_prefetch", False, None, ["r1", "r2", "r3"]),
+        ("prefetch", True, None, ["r1", "r2", "r3"]),
+        ("license", True, "mit", ["r1", "r3"]),
+    ])
+    def test_iter_public_repos(self, _, prefetch, license, expected):
+        """Test that iter_public_repos follows pagination lazily."""
+        pages = {
+            "page1": ([{"name": "r1", "license": {"key": "mit"}},
+                       {"name": "r2", "license": None}], "page2"),
+            "page2": ([{"name": "r3", "license": {"key": "mit"}}], None),
+        }
+        with patch("client.get_json_page",
+                   side_effect=lambda url, fields: pages[url]) as mock_page, \
+                patch.object(GithubOrgClient, "_public_repos_url",
+                             new_callable=PropertyMock,
+                             return_value="page1"):
+            client = GithubOrgClient("google")
+            repos = client.iter_public_repos(license, prefetch=prefetch)
+
+            self.assertEqual(next(repos), expected[0])
+            self.assertEqual(list(repos), expected[1:])
+            self.assertEqual(mock_page.call_count, 2)
+            mock_page.assert_called_with(
+                "page2", fields=GithubOrgClient.REPO_FIELDS
+            )
+
+    def test_iter_public_repos_prefetch_priority(self):
+        """Test that prefetched pages keep the caller's request priority."""
+        pages = {"p1": ([{"name": "r1"}], "p2"),
+                 "p2": ([{"name": "r2"}], None)}
+        seen = []
+
+        def get_json_page(url, fields):
+            seen.append((url, utils.current_priority()))
+            return pages[url]
+
+        with patch("client.get_json_page", side_effect=get_json_page), \
+                patch.object(GithubOrgClient, "_public_repos_url",
+                             new_callable=PropertyMock, return_value="p1"):
+            with utils.request_priority(utils.BULK):
+                list(GithubOrgClient("google").iter_public_repos(
+                    prefetch=True))
+        self.assertEqual(seen, [("p1", utils.BULK), ("p2", utils.BULK)])
+
     @parameterized.expand([
         ({"license": {"key": "my_license"}}, "my_license", True),
         ({"license": {"key": "other_license"}}, "my_license", False),
@@ -84,6 +183,134 @@ class TestGithubOrgClient(unittest.TestCase):
         self.assertEqual(result, expected)
 
 
+class TestRepoIndex(unittest.TestCase):
+    """Unit tests for RepoIndex"""
+    payload = [
+        {"name": "a", "license": {"key": "mit"}, "language": "Python",
+         "fork": False},
+        {"name": "b", "license": None, "language": "Python", "fork": True},
+        {"name": "c", "license": {"key": "mit"}, "language": "Go",
+         "fork": False},
+        {"name": "d", "language": "Python", "fork": False},
+    ]
+
+    @parameterized.expand([
+        ({}, ["a", "b", "c", "d"]),
+        ({"license": "mit"}, ["a", "c"]),
+        ({"language": "Python", "fork": False}, ["a", "d"]),
+        ({"license": "mit", "language": "Python"}, ["a"]),
+        ({"license": "apache-2.0"}, []),
+        ({"archived": True}, []),
+    ])
+    def test_select(self, facets, expected):
+        """Test that select intersects facets in payload order."""
+        self.assertEqual(RepoIndex(self.payload).select(**facets), expected)
+
+    def test_values(self):
+        """Test the distinct values of a facet."""
+        index = RepoIndex(self.payload)
+        self.assertEqual(index.values("language"), ["Python", "Go"])
+        self.assertEqual(index.values("license"), ["mit"])
+
+    def test_unknown_facet(self):
+        """Test that an unknown facet is rejected."""
+        with self.assertRaises(ValueError):
+            RepoIndex(self.payload).select(stars=5)
+
+
+class TestAsyncGithubOrgClient(unittest.IsolatedAsyncioTestCase):
+    """Unit tests for AsyncGithubOrgClient"""
+
+    def setUp(self):
+        """Start from an empty shared payload cache."""
+        GithubOrgClient.payload_cache.clear()
+
+    @patch("client.get_json")
+    async def test_org(self, mock_get_json):
+        """Test that org is fetched once, even by concurrent callers."""
+        mock_get_json.return_value = {"login": "google"}
+        client = AsyncGithubOrgClient("google")
+
+        results = await asyncio.gather(client.org(), client.org())
+
+        self.assertEqual(results, [{"login": "google"}] * 2)
+        mock_get_json.assert_called_once_with(
+            "https://api.github.com/orgs/google"
+        )
+
+    @patch("client.get_json")
+    async def test_org_failure_not_memoized(self, mock_get_json):
+        """Test that a failed fetch is retried on the next call."""
+        mock_get_json.side_effect = [ValueError("boom"), {"login": "abc"}]
+        client = AsyncGithubOrgClient("abc")
+
+        with self.assertRaises(ValueError):
+            await client.org()
+        self.assertEqual(await client.org(), {"login": "abc"})
+
+    @parameterized.expand([
+        (None, ["repo1", "repo2"]),
+        ("mit", ["repo1"]),
+    ])
+    async def test_public_repos(self, license, expected):
+        """Test that public_repos filters the repos payload."""
+        payloads = {
+            "https://api.github.com/orgs/google": {"repos_url": "repos"},
+            "repos": [{"name": "repo1", "license": {"key": "mit"}},
+                      {"name": "repo2"}],
+        }
+        with patch("client.get_json",
+                   side_effect=payloads.__getitem__) as mock_get_json:
+            client = AsyncGithubOrgClient("google")
+            self.assertEqual(await client.public_repos(license), expected)
+            self.assertEqual(await client.public_repos(license), expected)
+            self.assertEqual(mock_get_json.call_count, 2)
+
+    async def test_fetch_public_repos(self):
+        """Test that many orgs are fetched under the concurrency limit."""
+        lock = threading.Lock()
+        active = {"now": 0, "peak": 0}
+        release = threading.Event()
+
+        def get_json(url):
+            with lock:
+                active["now"] += 1
+                active["peak"] = max(active["peak"], active["now"])
+                if active["peak"] == 2:
+                    release.set()
+            release.wait(1)
+            with lock:
+                active["now"] -= 1
+            if url.endswith("/repos"):
+                return [{"name": url.split("/")[-2] + "-repo"}]
+            return {"repos_url": url + "/repos"}
+
+        names = ["org{}".format(i) for i in range(6)]
+        with patch("client.get_json", side_effect=get_json):
+            result = await fetch_public_repos(names, max_concurrency=2)
+
+        self.assertEqual(list(result), names)
+        self.assertEqual(result["org3"], ["org3-repo"])
+        self.assertEqual(active["peak"], 2)
+
+    @patch("client.get_json")
+    async def test_fetch_public_repos_exceptions(self, mock_get_json):
+        """Test that return_exceptions keeps the other orgs' results."""
+        def get_json(url):
+            if "bad" in url:
+                raise ValueError(url)
+            if url.endswith("/repos"):
+                return [{"name": "repo"}]
+            return {"repos_url": url + "/repos"}
+        mock_get_json.side_effect = get_json
+
+        result = await fetch_public_repos(["good", "bad"],
+                                          return_exceptions=True)
+
+        self.assertEqual(result["good"], ["repo"])
+        self.assertIsInstance(result["bad"], ValueError)
+
+
 @parameterized_class([
     {
         "org_payload": TEST_PAYLOAD[0][0],
@@ -97,16 +324,22 @@ class TestIntegrationGithubOrgClient(unittest.TestCase):
 
     @classmethod
     def setUpClass(cls):
-        """Set up class by patching requests.get."""
-        def get_side_effect(url):
-            mock_resp = Mock()
+        """Set up class by patching requests.Session.get."""
+        def get_side_effect(url, **kwargs):
+            payload = None
             if url == "https://api.github.com/orgs/google":
-                mock_resp.json.return_value = cls.org_payload
+                payload = cls.org_payload
             elif url == cls.org_payload["repos_url"]:
-                mock_resp.json.return_value = cls.repos_payload
+                payload = cls.repos_payload
+            content = json.dumps(payload).encode()
+            mock_resp = Mock(links={}, status_code=200, content=content,
+                             raw=io.BytesIO(content))
+            mock_resp.json.return_value = payload
             return mock_resp
 
-        cls.get_patcher = patch("requests.get", side_effect=get_side_effect)
+        cls.get_patcher = patch(
+            "requests.Session.get", side_effect=get_side_effect
+        )
         cls.get_patcher.start()
 
     @classmethod
@@ -114,6 +347,10 @@ class TestIntegrationGithubOrgClient(unittest.TestCase):
         """Stop patcher."""
         cls.get_patcher.stop()
 
+    def setUp(self):
+        """Start from an empty shared payload cache."""
+        GithubOrgClient.payload_cache.clear()
+
     def test_public_repos(self):
         """Test public_repos returns expected repo list."""
         client = GithubOrgClient("google")
@@ -126,6 +363,25 @@ class TestIntegrationGithubOrgClient(unittest.TestCase):
         result = client.public_repos(license="apache-2.0")
         self.assertEqual(result, self.apache2_repos)
 
+    def test_public_repos_with_facets(self):
+        """Test public_repos filtered by several facets."""
+        client = GithubOrgClient("google")
+        result = client.public_repos(license="apache-2.0",
+                                     language="JavaScript", fork=False)
+        self.assertEqual(result, ["kratu", "traceur-compiler"])
+
+    def test_iter_public_repos(self):
+        """Test iter_public_repos streams the same repos."""
+        client = GithubOrgClient("google")
+        self.assertEqual(
+            list(client.iter_public_repos(prefetch=True)),
+            self.expected_repos
+        )
+        self.assertEqual(
+            list(client.iter_public_repos(license="apache-2.0")),
+            self.apache2_repos
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
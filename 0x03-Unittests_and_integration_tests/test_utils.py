@@ -1,6 +1,14 @@
 #!/usr/bin/env python3
 """Unit tests for utils.py"""
+import io
+import json
+import shutil
+import tempfile
+import threading
+import time
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import MappingProxyType
 from unittest.mock import patch, Mock
 from parameterized import parameterized
 import utils
@@ -35,6 +43,50 @@ class TestAccessNestedMap(unittest.TestCase):
         )
 
 
+class TestCompilePath(unittest.TestCase):
+    """Unit tests for compile_path and extract"""
+
+    @parameterized.expand([
+        ({"a": 1}, ("a",), 1),
+        ({"a": {"b": 2}}, ("a",), {"b": 2}),
+        ({"a": {"b": 2}}, ("a", "b"), 2),
+        ({"a": {"b": {"c": 3}}}, ("a", "b", "c"), 3),
+        (MappingProxyType({"a": {"b": 2}}), ("a", "b"), 2),
+    ])
+    def test_compile_path(self, nested_map, path, expected):
+        """Test that the accessor matches access_nested_map"""
+        self.assertEqual(utils.compile_path(path)(nested_map), expected)
+
+    @parameterized.expand([
+        ({}, ("a",)),
+        ({"a": 1}, ("a", "b")),
+        ({"a": {"b": [1]}}, ("a", "b", 0)),
+        ({"a": {"b": {}}}, ("a", "b", "c")),
+    ])
+    def test_compile_path_exception(self, nested_map, path):
+        """Test KeyError, or the default, when path is invalid"""
+        with self.assertRaises(KeyError) as cm:
+            utils.compile_path(path)(nested_map)
+        self.assertEqual(cm.exception.args, (path[-1],))
+        self.assertIsNone(utils.compile_path(path, default=None)(nested_map))
+
+    def test_extract(self):
+        """Test pulling several paths out of many records"""
+        records = [
+            {"name": "a", "license": {"key": "mit"}},
+            {"name": "b", "license": None},
+        ]
+        self.assertEqual(
+            utils.extract(records, [("name",), ("license", "key")],
+                          default=None),
+            [("a", "mit"), ("b", None)]
+        )
+        self.assertEqual(utils.extract(records, [("name",)]),
+                         [("a",), ("b",)])
+        with self.assertRaises(KeyError):
+            utils.extract(records, [("license", "key")])
+
+
 class TestGetJson(unittest.TestCase):
     """Tests for get_json"""
 
@@ -42,15 +94,428 @@ class TestGetJson(unittest.TestCase):
         ("http://example.com", {"payload": True}),
         ("http://holberton.io", {"payload": False}),
     ])
-    @patch("utils.requests.get")
-    def test_get_json(self, test_url, test_payload, mock_get):
+    @patch("utils.get_session")
+    def test_get_json(self, test_url, test_payload, mock_session):
         """Test get_json output and call"""
+        mock_get = mock_session.return_value.get
         mock_get.return_value = Mock(json=lambda: test_payload)
         self.assertEqual(
             utils.get_json(test_url),
             test_payload
         )
-        mock_get.assert_called_once_with(test_url)
+        mock_get.assert_called_once_with(
+            test_url, timeout=utils.DEFAULT_TIMEOUT
+        )
+
+
+class TestGetJsonPage(unittest.TestCase):
+    """Tests for get_json_page"""
+
+    @parameterized.expand([
+        ({"next": {"url": "http://example.com?page=2"}},
+         "http://example.com?page=2"),
+        ({}, None),
+    ])
+    @patch("utils.get_session")
+    def test_get_json_page(self, links, expected_next, mock_session):
+        """Test payload and next-page URL from the Link header"""
+        mock_session.return_value.get.return_value = Mock(
+            json=lambda: [{"name": "repo"}], links=links
+        )
+        self.assertEqual(
+            utils.get_json_page("http://example.com"),
+            ([{"name": "repo"}], expected_next)
+        )
+
+
+class TestProjection(unittest.TestCase):
+    """Tests for project and projected listings"""
+    records = [
+        {"id": 1, "name": "a", "license": {"key": "mit", "name": "MIT"}},
+        {"id": 2, "name": "b", "license": None},
+        {"id": 3, "name": "c"},
+    ]
+    fields = [("name",), ("license", "key")]
+    expected = [
+        {"name": "a", "license": {"key": "mit"}},
+        {"name": "b"},
+        {"name": "c"},
+    ]
+
+    def test_project(self):
+        """Test that only the given paths are kept"""
+        keep = utils.project(self.fields)
+        self.assertEqual([keep(record) for record in self.records],
+                         self.expected)
+
+    def response(self):
+        """A fake response carrying the records"""
+        content = json.dumps(self.records).encode()
+        return Mock(json=lambda: json.loads(content), content=content,
+                    raw=io.BytesIO(content), links={}, status_code=200)
+
+    @parameterized.expand([
+        ("orjson", True),
+        ("json", False),
+    ])
+    @patch("utils.ijson", None)
+    @patch("utils.get_session")
+    def test_get_json_page_fields(self, _, use_orjson, mock_session):
+        """Test projected listings with the buffered parsers"""
+        mock_session.return_value.get.return_value = self.response()
+        orjson = utils.orjson if use_orjson else None
+        if use_orjson and orjson is None:
+            self.skipTest("orjson is not installed")
+        with patch("utils.orjson", orjson):
+            page, _ = utils.get_json_page("http://example.com",
+                                          fields=self.fields)
+        self.assertEqual(page, self.expected)
+        mock_session.return_value.get.assert_called_once_with(
+            "http://example.com", timeout=utils.DEFAULT_TIMEOUT
+        )
+
+    @unittest.skipIf(utils.ijson is None, "ijson is not installed")
+    @patch("utils.get_session")
+    def test_get_json_page_fields_streaming(self, mock_session):
+        """Test projected listings streamed with ijson"""
+        mock_session.return_value.get.return_value = self.response()
+        page, _ = utils.get_json_page("http://example.com",
+                                      fields=self.fields)
+        self.assertEqual(page, self.expected)
+        mock_session.return_value.get.assert_called_once_with(
+            "http://example.com", timeout=utils.DEFAULT_TIMEOUT,
+            stream=True
+        )
+
+    @patch("utils.get_session")
+    def test_get_json_page_fields_streaming_stub(self, mock_session):
+        """Test the streaming path against a stub ijson"""
+        response = self.response()
+        mock_session.return_value.get.return_value = response
+
+        def items(source, prefix, use_float):
+            self.assertEqual((prefix, use_float), ("item", True))
+            self.assertTrue(source.decode_content)
+            yield from json.load(source)
+
+        with patch("utils.ijson", Mock(items=items)):
+            page, _ = utils.get_json_page("http://example.com",
+                                          fields=self.fields)
+        self.assertEqual(page, self.expected)
+        mock_session.return_value.get.assert_called_once_with(
+            "http://example.com", timeout=utils.DEFAULT_TIMEOUT,
+            stream=True
+        )
+        response.close.assert_called_once_with()
+
+
+class TestGetSession(unittest.TestCase):
+    """Tests for get_session"""
+
+    def test_session_per_thread_shared_pool(self):
+        """Sessions are reused per thread and share one adapter"""
+        session = utils.get_session()
+        self.assertIs(session, utils.get_session())
+
+        other = []
+        thread = threading.Thread(
+            target=lambda: other.append(utils.get_session())
+        )
+        thread.start()
+        thread.join()
+
+        self.assertIsNot(session, other[0])
+        self.assertIs(
+            session.get_adapter("https://api.github.com"),
+            other[0].get_adapter("https://api.github.com")
+        )
+        self.assertIn("gzip", session.headers["Accept-Encoding"])
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves a JSON payload with an ETag and a per-path Cache-Control"""
+    payload = {"login": "google"}
+    etag = '"v1"'
+    requests_seen = []
+
+    def do_GET(self):
+        """Answer 304 when the client's ETag matches"""
+        self.requests_seen.append(
+            (self.path, self.headers.get("If-None-Match"))
+        )
+        cache_control = {
+            "/fresh": "max-age=60",
+            "/no-store": "no-store",
+            "/paged": "max-age=60",
+        }.get(self.path, "no-cache")
+        link = '<{}/paged?page=2>; rel="next"'.format(
+            "http://" + self.headers["Host"]
+        ) if self.path == "/paged" else None
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.send_header("ETag", self.etag)
+            self.send_header("Cache-Control", cache_control)
+            self.end_headers()
+            return
+        body = json.dumps(self.payload).encode()
+        self.send_response(200)
+        if link:
+            self.send_header("Link", link)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", self.etag)
+        self.send_header("Cache-Control", cache_control)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Keep test output quiet"""
+
+
+class TestHTTPCache(unittest.TestCase):
+    """Tests for the conditional-request cache against a stub server"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Start the stub HTTP server"""
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        cls.base_url = "http://127.0.0.1:{}".format(cls.server.server_port)
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the stub HTTP server"""
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        """Fresh cache directory per test"""
+        self.directory = tempfile.mkdtemp()
+        utils.set_http_cache(utils.HTTPCache(self.directory))
+        StubHandler.requests_seen = []
+
+    def tearDown(self):
+        """Disable the cache"""
+        utils.set_http_cache(None)
+        shutil.rmtree(self.directory)
+
+    def test_revalidates_with_etag(self):
+        """A no-cache entry is revalidated and served from a 304"""
+        url = self.base_url + "/org"
+        self.assertEqual(utils.get_json(url), StubHandler.payload)
+        # A new cache object on the same directory, as in another process
+        utils.set_http_cache(utils.HTTPCache(self.directory))
+        self.assertEqual(utils.get_json(url), StubHandler.payload)
+        self.assertEqual(
+            StubHandler.requests_seen,
+            [("/org", None), ("/org", '"v1"')]
+        )
+
+    def test_fresh_entry_skips_request(self):
+        """A max-age entry is served without contacting the server"""
+        url = self.base_url + "/fresh"
+        utils.get_json(url)
+        self.assertEqual(utils.get_json(url), StubHandler.payload)
+        self.assertEqual(len(StubHandler.requests_seen), 1)
+
+    def test_shared_entry_keeps_next_page(self):
+        """get_json and get_json_page share an entry without losing
+        the next-page link"""
+        url = self.base_url + "/paged"
+        utils.get_json(url)
+        self.assertEqual(utils.get_json_page(url),
+                         (StubHandler.payload, url + "?page=2"))
+        self.assertEqual(len(StubHandler.requests_seen), 1)
+
+    def test_no_store_is_not_cached(self):
+        """no-store responses are fetched in full every time"""
+        url = self.base_url + "/no-store"
+        utils.get_json(url)
+        utils.get_json(url)
+        self.assertEqual(
+            StubHandler.requests_seen,
+            [("/no-store", None), ("/no-store", None)]
+        )
+
+    @parameterized.expand([
+        ("private, max-age=60",
+         {"private": None, "max-age": "60"}),
+        ("no-cache", {"no-cache": None}),
+        (None, {}),
+    ])
+    def test_parse_cache_control(self, header, expected):
+        """Test Cache-Control parsing"""
+        self.assertEqual(utils.parse_cache_control(header), expected)
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Tests for the rate limiter under get_json"""
+
+    def setUp(self):
+        """Install a limiter with no throttling by default"""
+        self.limiter = utils.RateLimiter(rate=1000, burst=1000,
+                                         max_retries=2)
+        utils.set_rate_limiter(self.limiter)
+
+    def tearDown(self):
+        """Remove the limiter"""
+        utils.set_rate_limiter(None)
+
+    @staticmethod
+    def response(status, headers=None, payload=None):
+        """A fake response"""
+        return Mock(status_code=status, headers=headers or {},
+                    json=lambda: payload, links={})
+
+    @parameterized.expand([
+        ("server_error", 503, {}),
+        ("throttled", 429, {"Retry-After": "0"}),
+        ("secondary_limit", 403, {"Retry-After": "0"}),
+    ])
+    @patch("utils.time.sleep")
+    @patch("utils.get_session")
+    def test_retries(self, _, status, headers, mock_session, mock_sleep):
+        """Test that throttled and failed requests are retried"""
+        mock_session.return_value.get.side_effect = [
+            self.response(status, headers),
+            self.response(200, payload={"login": "google"}),
+        ]
+        self.assertEqual(utils.get_json("http://example.com"),
+                         {"login": "google"})
+        self.assertEqual(mock_session.return_value.get.call_count, 2)
+        mock_sleep.assert_called_once()
+
+    @patch("utils.time.sleep")
+    @patch("utils.get_session")
+    def test_gives_up(self, mock_session, mock_sleep):
+        """Test that the last response is returned after max_retries"""
+        mock_session.return_value.get.return_value = self.response(
+            502, payload={"message": "Bad Gateway"}
+        )
+        self.assertEqual(utils.get_json("http://example.com"),
+                         {"message": "Bad Gateway"})
+        self.assertEqual(mock_session.return_value.get.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    @patch("utils.get_session")
+    def test_no_retry_on_client_error(self, mock_session):
+        """Test that a plain 404 is not retried"""
+        mock_session.return_value.get.return_value = self.response(404)
+        utils.get_json("http://example.com")
+        mock_session.return_value.get.assert_called_once()
+
+    def test_retry_after_blocks_everyone(self):
+        """Test that Retry-After pauses every priority"""
+        self.limiter.update(self.response(429, {"Retry-After": "30"}))
+        self.assertGreater(self.limiter.wait_time(utils.INTERACTIVE), 29)
+        self.assertGreater(self.limiter.wait_time(utils.BULK), 29)
+
+    @parameterized.expand([
+        ("authenticated", "5000", "600", 0),
+        ("unauthenticated", "60", "59", 0),
+        ("unauthenticated_low", "60", "6", 59),
+        ("no_limit_header", None, "6", 0),
+    ])
+    def test_bulk_reserve(self, _, limit, remaining, min_wait):
+        """Test the reserve is a fraction of the reported limit"""
+        headers = {"X-RateLimit-Remaining": remaining,
+                   "X-RateLimit-Reset": str(time.time() + 60)}
+        if limit is not None:
+            headers["X-RateLimit-Limit"] = limit
+        self.limiter.update(self.response(200, headers))
+        wait = self.limiter.wait_time(utils.BULK)
+        if min_wait:
+            self.assertGreater(wait, min_wait)
+        else:
+            self.assertEqual(wait, 0)
+
+    def test_reserve_kept_for_interactive(self):
+        """Test that bulk requests stop short of the remaining limit"""
+        self.limiter.update(self.response(200, {
+            "X-RateLimit-Limit": "5000",
+            "X-RateLimit-Remaining": "50",
+            "X-RateLimit-Reset": str(time.time() + 60),
+        }))
+        self.assertEqual(self.limiter.wait_time(utils.INTERACTIVE), 0)
+        self.assertGreater(self.limiter.wait_time(utils.BULK), 59)
+        with utils.request_priority(utils.BULK):
+            self.assertGreater(self.limiter.wait_time(), 59)
+        self.assertEqual(self.limiter.wait_time(), 0)
+
+    def test_token_bucket(self):
+        """Test that requests beyond the burst wait for a token"""
+        with patch("utils.time.monotonic", return_value=100.0):
+            limiter = utils.RateLimiter(rate=2, burst=1)
+            limiter.acquire()
+            self.assertAlmostEqual(limiter.wait_time(), 0.5)
+
+
+class TestLRUCache(unittest.TestCase):
+    """Tests for LRUCache"""
+
+    def test_evicts_least_recently_used(self):
+        """Test that the least recently used entry is evicted"""
+        cache = utils.LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+        self.assertEqual(
+            cache.cache_info(),
+            utils.CacheInfo(hits=3, misses=1, evictions=1, expirations=0,
+                            maxsize=2, currsize=2)
+        )
+
+    def test_entries_expire(self):
+        """Test default and per-entry ttl"""
+        cache = utils.LRUCache(ttl=10)
+        with patch("utils.time.monotonic", return_value=0):
+            cache.set("default", 1)
+            cache.set("long", 2, ttl=100)
+        with patch("utils.time.monotonic", return_value=50):
+            self.assertIsNone(cache.get("default"))
+            self.assertEqual(cache.get("long"), 2)
+        self.assertEqual(cache.cache_info().expirations, 1)
+        self.assertEqual(len(cache), 1)
+
+    def test_get_or_set_single_flight(self):
+        """Test that concurrent misses on a key run the factory once"""
+        cache = utils.LRUCache()
+        release = threading.Event()
+        calls = []
+
+        def factory():
+            calls.append(1)
+            release.wait(1)
+            return "payload"
+
+        results = []
+        threads = [threading.Thread(
+            target=lambda: results.append(cache.get_or_set("url", factory))
+        ) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["payload"] * 5)
+
+    def test_get_or_set(self):
+        """Test that the factory only runs on a miss"""
+        cache = utils.LRUCache()
+        factory = Mock(return_value={"payload": True})
+        self.assertEqual(cache.get_or_set("url", factory), {"payload": True})
+        self.assertEqual(cache.get_or_set("url", factory), {"payload": True})
+        factory.assert_called_once_with()
+        cache.invalidate("url")
+        cache.get_or_set("url", factory)
+        self.assertEqual(factory.call_count, 2)
 
 
 class TestMemoize(unittest.TestCase):
@@ -76,3 +541,110 @@ class TestMemoize(unittest.TestCase):
             self.assertEqual(test.a_property, 42)
             self.assertEqual(test.a_property, 42)
             mock_method.assert_called_once()
+
+    def test_memoize_ttl_and_invalidate(self):
+        """Test that values expire after ttl and can be invalidated"""
+
+        class TestClass:
+            calls = 0
+
+            @utils.memoize(ttl=60)
+            def a_property(self):
+                TestClass.calls += 1
+                return TestClass.calls
+
+        test = TestClass()
+        with patch("utils.time.monotonic", return_value=0):
+            self.assertEqual(test.a_property, 1)
+            self.assertEqual(test.a_property, 1)
+        with patch("utils.time.monotonic", return_value=61):
+            self.assertEqual(test.a_property, 2)
+            TestClass.a_property.invalidate(test)
+            self.assertEqual(test.a_property, 3)
+        self.assertEqual(TestClass().a_property, 4)
+
+    def test_memoize_computes_once_across_threads(self):
+        """Test that concurrent first accesses compute the value once"""
+        started = threading.Event()
+
+        class TestClass:
+            calls = 0
+
+            @utils.memoize
+            def a_property(self):
+                TestClass.calls += 1
+                started.wait(1)
+                return 42
+
+        test = TestClass()
+        threads = [threading.Thread(target=lambda: test.a_property)
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        started.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(TestClass.calls, 1)
+
+    @parameterized.expand([
+        ("weakref", ("__weakref__",)),
+        ("own_slot", ("_a_property",)),
+    ])
+    def test_memoize_slotted_class(self, _, slots):
+        """Test memoization on classes without a __dict__"""
+
+        class TestClass:
+            __slots__ = slots
+
+            def a_method(self):
+                return 42
+
+            @utils.memoize
+            def a_property(self):
+                return self.a_method()
+
+        with patch.object(TestClass, "a_method",
+                          return_value=42) as mock_method:
+            test = TestClass()
+            self.assertEqual(test.a_property, 42)
+            self.assertEqual(test.a_property, 42)
+            mock_method.assert_called_once()
+
+    def test_memoize_slotted_equal_instances(self):
+        """Test that equal slotted instances keep separate values"""
+
+        class TestClass:
+            __slots__ = ("__weakref__",)
+            calls = []
+
+            def __eq__(self, other):
+                return isinstance(other, TestClass)
+
+            def __hash__(self):
+                return 0
+
+            @utils.memoize
+            def a_property(self):
+                TestClass.calls.append(self)
+                return len(TestClass.calls)
+
+        first, second = TestClass(), TestClass()
+        self.assertEqual((first.a_property, second.a_property), (1, 2))
+        self.assertEqual((first.a_property, second.a_property), (1, 2))
+        prop = TestClass.__dict__["a_property"]
+        del first
+        TestClass.calls.clear()
+        self.assertEqual(len(prop._cells), 1)
+
+    def test_memoize_unsupported_slots(self):
+        """Test that a class with nowhere to keep the value is rejected"""
+
+        class TestClass:
+            __slots__ = ()
+
+            @utils.memoize
+            def a_property(self):
+                return 42
+
+        with self.assertRaises(TypeError):
+            TestClass().a_property
@@ -1,7 +1,20 @@
 #!/usr/bin/env python3
 """Generic utilities for github org client.
 """
+import contextvars
+import email.utils
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import weakref
 import requests
+from requests.adapters import HTTPAdapter
+from collections import OrderedDict
+from contextlib import contextmanager
 from functools import wraps
 from typing import (
     Mapping,
@@ -9,12 +22,43 @@ from typing import (
     Any,
     Dict,
     Callable,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
 )
 
+try:
+    import ijson
+except ImportError:  # streaming parse is optional
+    ijson = None
+try:
+    import orjson
+except ImportError:  # faster parser is optional
+    orjson = None
+
 __all__ = [
     "access_nested_map",
+    "compile_path",
+    "extract",
+    "project",
     "get_json",
+    "get_json_page",
+    "get_session",
+    "HTTPCache",
+    "set_http_cache",
+    "RateLimiter",
+    "set_rate_limiter",
+    "request_priority",
+    "current_priority",
+    "INTERACTIVE",
+    "BULK",
     "memoize",
+    "LRUCache",
+    "CacheInfo",
 ]
 
 
@@ -40,15 +84,739 @@ def access_nested_map(nested_map: Mapping, path: Sequence) -> Any:
     return nested_map
 
 
-def get_json(url: str) -> Dict:
-    """Get JSON from remote URL.
+_MISSING = object()
+
+
+def compile_path(path: Sequence, default: Any = _MISSING) -> Callable:
+    """Compile a key path into a fast accessor for nested maps.
+    The accessor behaves like ``access_nested_map(nested_map, path)``
+    but checks plain dicts by exact type before falling back to the
+    Mapping ABC, and is unrolled for short paths. With ``default`` a
+    missing key or a non-mapping on the way returns it instead of
+    raising KeyError.
+    Example
+    -------
+    >>> license_key = compile_path(("license", "key"), default=None)
+    >>> license_key({"license": {"key": "mit"}})
+    'mit'
+    >>> license_key({"license": None}) is None
+    True
+    """
+    keys = tuple(path)
+
+    def fail(key: Any) -> Any:
+        if default is _MISSING:
+            raise KeyError(key)
+        return default
+
+    if len(keys) == 1:
+        (first,) = keys
+
+        def accessor(nested_map: Mapping) -> Any:
+            if type(nested_map) is not dict \
+                    and not isinstance(nested_map, Mapping):
+                return fail(first)
+            try:
+                return nested_map[first]
+            except KeyError:
+                return fail(first)
+    elif len(keys) == 2:
+        first, second = keys
+
+        def accessor(nested_map: Mapping) -> Any:
+            if type(nested_map) is not dict \
+                    and not isinstance(nested_map, Mapping):
+                return fail(first)
+            try:
+                inner = nested_map[first]
+            except KeyError:
+                return fail(first)
+            if type(inner) is not dict and not isinstance(inner, Mapping):
+                return fail(second)
+            try:
+                return inner[second]
+            except KeyError:
+                return fail(second)
+    else:
+        def accessor(nested_map: Mapping) -> Any:
+            for key in keys:
+                if type(nested_map) is not dict \
+                        and not isinstance(nested_map, Mapping):
+                    return fail(key)
+                try:
+                    nested_map = nested_map[key]
+                except KeyError:
+                    return fail(key)
+            return nested_map
+
+    accessor.path = keys
+    return accessor
+
+
+def extract(records: Iterable[Mapping], paths: Sequence[Sequence],
+            default: Any = _MISSING) -> List[Tuple]:
+    """Pull several key paths out of many records in one pass.
+    Returns one tuple per record, holding the value at each path.
+    Example
+    -------
+    >>> extract([{"a": 1, "b": {"c": 2}}], [("a",), ("b", "c")])
+    [(1, 2)]
+    """
+    getters = [compile_path(path, default) for path in paths]
+    if len(getters) == 1:
+        (get,) = getters
+        return [(get(record),) for record in records]
+    return [tuple([get(record) for get in getters]) for record in records]
+
+
+def project(fields: Sequence[Sequence]) -> Callable[[Mapping], Dict]:
+    """Build a function keeping only the given key paths of a record.
+    Nested paths keep their nesting; missing keys are left out.
+    Example
+    -------
+    >>> keep = project([("name",), ("license", "key")])
+    >>> keep({"name": "a", "id": 1, "license": {"key": "mit", "url": ""}})
+    {'name': 'a', 'license': {'key': 'mit'}}
+    """
+    paths = [tuple(path) for path in fields]
+
+    def projector(record: Mapping) -> Dict:
+        result: Dict = {}
+        for path in paths:
+            source, target = record, result
+            for key in path[:-1]:
+                source = source.get(key) \
+                    if isinstance(source, Mapping) else None
+                if not isinstance(source, Mapping):
+                    break
+                target = target.setdefault(key, {})
+            else:
+                if isinstance(source, Mapping) and path[-1] in source:
+                    target[path[-1]] = source[path[-1]]
+        return result
+
+    return projector
+
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (3.05, 30)
+POOL_MAXSIZE = 16
+
+# One connection pool shared by every thread's session, so keep-alive
+# connections are reused across threads as well as across calls.
+_adapter = HTTPAdapter(
+    pool_connections=POOL_MAXSIZE, pool_maxsize=POOL_MAXSIZE
+)
+_local = threading.local()
+
+
+def get_session() -> requests.Session:
+    """Return this thread's session.
+    Sessions are per thread (requests.Session is not thread-safe) but all
+    mount the same pooled adapter.
+    """
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update({
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+        })
+        session.mount("https://", _adapter)
+        session.mount("http://", _adapter)
+        _local.session = session
+    return session
+
+
+def parse_cache_control(header: Optional[str]) -> Dict[str, Optional[str]]:
+    """Parse a Cache-Control header into a directive -> value dict.
+    Example
+    -------
+    >>> parse_cache_control("private, max-age=60")
+    {'private': None, 'max-age': '60'}
+    """
+    directives = {}
+    for part in (header or "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+class HTTPCache:
+    """On-disk cache of JSON responses, revalidated with ETag/Last-Modified.
+    Entries are fresh for ``max-age`` seconds; after that (or always, for
+    ``no-cache``) they are revalidated with ``If-None-Match`` /
+    ``If-Modified-Since`` so an unchanged payload costs a 304. ``no-store``
+    responses are never written. Safe to share between processes.
+    """
+
+    def __init__(self, directory: str) -> None:
+        """Init method of HTTPCache"""
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        name = hashlib.sha256(url.encode()).hexdigest()
+        return os.path.join(self.directory, name + ".json")
+
+    def load(self, url: str) -> Optional[Dict]:
+        """Return the cache entry for ``url``, if any"""
+        try:
+            with open(self._path(url)) as cache_file:
+                entry = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get("url") == url else None
+
+    def store(self, url: str, response: Any, body: Any,
+              next_url: Optional[str] = None) -> None:
+        """Save a 200 response, honouring its Cache-Control header"""
+        directives = parse_cache_control(
+            response.headers.get("Cache-Control")
+        )
+        if "no-store" in directives:
+            self.delete(url)
+            return
+        self._write({
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "expires": self._expires(directives),
+            "body": body,
+            "next_url": next_url,
+        })
+
+    def refresh(self, entry: Dict, response: Any) -> None:
+        """Extend an entry's freshness after a 304 Not Modified"""
+        directives = parse_cache_control(
+            response.headers.get("Cache-Control")
+        )
+        entry["expires"] = self._expires(directives)
+        entry["etag"] = response.headers.get("ETag") or entry["etag"]
+        self._write(entry)
+
+    @staticmethod
+    def _expires(directives: Dict[str, Optional[str]]) -> float:
+        if "no-cache" in directives:
+            return 0.0
+        try:
+            return time.time() + int(directives.get("max-age") or 0)
+        except ValueError:
+            return 0.0
+
+    @staticmethod
+    def is_fresh(entry: Dict) -> bool:
+        """Whether an entry can be used without revalidation"""
+        return entry["expires"] > time.time()
+
+    @staticmethod
+    def validators(entry: Dict) -> Dict[str, str]:
+        """Conditional request headers for an entry"""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def _write(self, entry: Dict) -> None:
+        # Write then rename, so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as cache_file:
+            json.dump(entry, cache_file)
+        os.replace(tmp_path, self._path(entry["url"]))
+
+    def delete(self, url: str) -> None:
+        """Drop the entry for ``url``"""
+        try:
+            os.remove(self._path(url))
+        except FileNotFoundError:
+            pass
+
+
+_http_cache: Optional[HTTPCache] = None
+
+
+def set_http_cache(cache: Optional[HTTPCache]) -> None:
+    """Enable (or with None, disable) the HTTP cache used by get_json"""
+    global _http_cache
+    _http_cache = cache
+
+
+INTERACTIVE = 0
+BULK = 1
+
+_priority: contextvars.ContextVar = contextvars.ContextVar(
+    "request_priority", default=INTERACTIVE
+)
+
+
+@contextmanager
+def request_priority(priority: int) -> Iterator[None]:
+    """Send the requests made in this block at INTERACTIVE or BULK
+    priority. Copied into asyncio tasks and asyncio.to_thread calls.
     """
-    response = requests.get(url)
-    return response.json()
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
 
 
-def memoize(fn: Callable) -> Callable:
+def current_priority() -> int:
+    """The request priority in effect: INTERACTIVE or BULK"""
+    return _priority.get()
+
+
+class RateLimiter:
+    """Client-side throttle for the GitHub API.
+    A token bucket allows ``rate`` requests per second with bursts of
+    ``burst``. The ``X-RateLimit-Remaining``/``X-RateLimit-Reset``
+    headers of each response are tracked: BULK requests stop when only
+    a ``reserve`` fraction of ``X-RateLimit-Limit`` is left before the
+    reset, and INTERACTIVE ones stop at zero. ``Retry-After`` pauses
+    everyone. BULK requests also wait while an INTERACTIVE one is
+    waiting. 429, 5xx and rate-limit 403 responses are retried up to
+    ``max_retries`` times with jittered exponential backoff.
+    """
+    RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+    def __init__(self, rate: float = 10.0, burst: int = 10,
+                 reserve: float = 0.1, max_retries: int = 3,
+                 backoff: float = 1.0, max_backoff: float = 60.0) -> None:
+        """Init method of RateLimiter"""
+        self.rate = rate
+        self.burst = burst
+        self.reserve = reserve
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._condition = threading.Condition()
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._limit: Optional[int] = None
+        self._remaining: Optional[int] = None
+        self._reset_at = 0.0
+        self._blocked_until = 0.0
+        self._interactive_waiting = 0
+
+    def wait_time(self, priority: Optional[int] = None) -> Optional[float]:
+        """Seconds until a request at priority may be sent: 0 if now,
+        None if it must wait for an INTERACTIVE request to go first.
+        Priority defaults to the one set with request_priority.
+        """
+        if priority is None:
+            priority = current_priority()
+        with self._condition:
+            return self._wait_time(priority)
+
+    def _wait_time(self, priority: int) -> Optional[float]:
+        now = time.monotonic()
+        self._tokens = min(self.burst,
+                           self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if self._remaining is not None:
+            floor = self._bulk_floor() if priority == BULK else 0
+            until_reset = self._reset_at - time.time()
+            if self._remaining <= floor and until_reset > 0:
+                return until_reset
+        if priority == BULK and self._interactive_waiting:
+            return None
+        if self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+        return 0.0
+
+    def _bulk_floor(self) -> int:
+        """Requests kept back from BULK callers; always below the limit"""
+        if not self._limit:
+            return 0
+        return min(int(self._limit * self.reserve), self._limit - 1)
+
+    def acquire(self, priority: Optional[int] = None) -> None:
+        """Block until a request may be sent, then take a token.
+        Priority defaults to the one set with request_priority.
+        """
+        if priority is None:
+            priority = current_priority()
+        with self._condition:
+            if priority != BULK:
+                self._interactive_waiting += 1
+            try:
+                while True:
+                    delay = self._wait_time(priority)
+                    if delay == 0:
+                        self._tokens -= 1
+                        if self._remaining is not None:
+                            self._remaining -= 1
+                        return
+                    self._condition.wait(delay)
+            finally:
+                if priority != BULK:
+                    self._interactive_waiting -= 1
+                    self._condition.notify_all()
+
+    def update(self, response: Any) -> None:
+        """Record the rate-limit headers of a response"""
+        headers = response.headers
+        with self._condition:
+            try:
+                self._remaining = int(headers["X-RateLimit-Remaining"])
+                self._reset_at = float(headers["X-RateLimit-Reset"])
+            except (KeyError, TypeError, ValueError):
+                pass
+            try:
+                self._limit = int(headers["X-RateLimit-Limit"])
+            except (KeyError, TypeError, ValueError):
+                pass
+            retry_after = self._retry_after(response)
+            if retry_after is not None:
+                self._blocked_until = max(self._blocked_until,
+                                          time.monotonic() + retry_after)
+            self._condition.notify_all()
+
+    @staticmethod
+    def _retry_after(response: Any) -> Optional[float]:
+        """Retry-After in seconds, given as seconds or an HTTP date"""
+        value = response.headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, when.timestamp() - time.time())
+
+    def should_retry(self, response: Any) -> bool:
+        """Whether the response is a throttle or server error"""
+        if response.status_code in self.RETRY_STATUSES:
+            return True
+        # GitHub signals primary and secondary limits with 403 too
+        return response.status_code == 403 and (
+            "Retry-After" in response.headers
+            or response.headers.get("X-RateLimit-Remaining") == "0"
+        )
+
+    def retry_delay(self, attempt: int, response: Any) -> float:
+        """Backoff before retry number attempt (0-based); acquire()
+        already waits out Retry-After and exhausted limits.
+        """
+        if self._retry_after(response) is not None \
+                or response.status_code == 403:
+            return 0.0
+        cap = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return random.uniform(cap / 2, cap)
+
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def set_rate_limiter(limiter: Optional[RateLimiter]) -> None:
+    """Enable (or with None, disable) the rate limiter used by get_json"""
+    global _rate_limiter
+    _rate_limiter = limiter
+
+
+def _get(url: str, timeout: Any, **options: Any) -> Any:
+    """GET through the rate limiter, retrying throttled requests"""
+    limiter = _rate_limiter
+    if limiter is None:
+        return get_session().get(url, timeout=timeout, **options)
+    attempt = 0
+    while True:
+        limiter.acquire()
+        response = get_session().get(url, timeout=timeout, **options)
+        limiter.update(response)
+        if attempt >= limiter.max_retries \
+                or not limiter.should_retry(response):
+            return response
+        response.close()
+        time.sleep(limiter.retry_delay(attempt, response))
+        attempt += 1
+
+
+def _parse_records(response: Any,
+                   fields: Sequence[Sequence]) -> List[Dict]:
+    """Parse a JSON array of records keeping only ``fields`` of each.
+    Streams the body with ijson when installed, so the full tree is
+    never built; otherwise parses with orjson, then the json module.
+    """
+    keep = project(fields)
+    if ijson is not None:
+        response.raw.decode_content = True
+        return [keep(record)
+                for record in ijson.items(response.raw, "item",
+                                          use_float=True)]
+    if orjson is not None:
+        records = orjson.loads(response.content)
+    else:
+        records = response.json()
+    return [keep(record) for record in records]
+
+
+def _fetch(url: str, timeout: Any,
+           fields: Optional[Sequence[Sequence]] = None
+           ) -> Tuple[Any, Optional[str]]:
+    """GET ``url`` through the HTTP cache when one is enabled"""
+    cache = _http_cache
+    # Projected bodies are cached apart from the full one
+    key = url if fields is None else "{} {}".format(
+        url, json.dumps([list(path) for path in fields])
+    )
+    entry = cache.load(key) if cache is not None else None
+    if entry is not None and cache.is_fresh(entry):
+        return entry["body"], entry["next_url"]
+
+    options: Dict[str, Any] = {}
+    headers = cache.validators(entry) if entry is not None else {}
+    if headers:
+        options["headers"] = headers
+    if fields is not None and ijson is not None:
+        options["stream"] = True
+    response = _get(url, timeout, **options)
+    if entry is not None and response.status_code == 304:
+        cache.refresh(entry, response)
+        return entry["body"], entry["next_url"]
+
+    if fields is None:
+        body = response.json()
+    else:
+        try:
+            body = _parse_records(response, fields)
+        finally:
+            response.close()
+    # Always recorded, so get_json and get_json_page can share an entry
+    next_url = response.links.get("next", {}).get("url")
+    if cache is not None and response.status_code == 200:
+        cache.store(key, response, body, next_url)
+    return body, next_url
+
+
+def get_json(url: str, timeout: Any = DEFAULT_TIMEOUT) -> Dict:
+    """Get JSON from remote URL over a pooled keep-alive connection.
+    Goes through the HTTP cache and the rate limiter when they are set
+    with set_http_cache and set_rate_limiter.
+    """
+    return _fetch(url, timeout)[0]
+
+
+def get_json_page(
+    url: str, timeout: Any = DEFAULT_TIMEOUT,
+    fields: Optional[Sequence[Sequence]] = None
+) -> Tuple[Any, Optional[str]]:
+    """Get one page of a paginated JSON listing.
+    Returns the payload and the URL of the next page from the
+    ``Link: <...>; rel="next"`` header, or None on the last page.
+    With ``fields`` (key paths) each record of the listing keeps only
+    those paths, and the body is parsed by a streaming or faster
+    parser when one is installed; see _parse_records.
+    """
+    return _fetch(url, timeout, fields=fields)
+
+
+class CacheInfo(NamedTuple):
+    """LRUCache statistics"""
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    maxsize: int
+    currsize: int
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU mapping with per-entry expiry.
+    Once ``maxsize`` entries are held the least recently used one is
+    evicted. Entries older than their ``ttl`` (the cache default unless
+    given per entry; None never expires) count as misses.
+    """
+
+    def __init__(self, maxsize: int = 128,
+                 ttl: Optional[float] = None) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # key -> (value, expires); least recently used first
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        # key -> [lock, waiters] for misses being computed
+        self._inflight: Dict[Hashable, list] = {}
+        self._hits = self._misses = 0
+        self._evictions = self._expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the live value for key, or default"""
+        with self._lock:
+            return self._lookup(key, default, count=True)
+
+    def _lookup(self, key: Hashable, default: Any, count: bool) -> Any:
+        """get() with the lock held; ``count`` updates hits/misses"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] is not None \
+                and time.monotonic() >= entry[1]:
+            del self._entries[key]
+            self._expirations += 1
+            entry = None
+        if entry is None:
+            if count:
+                self._misses += 1
+            return default
+        self._entries.move_to_end(key)
+        if count:
+            self._hits += 1
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any,
+            ttl: Optional[float] = None) -> None:
+        """Store value under key, evicting the least recently used"""
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any],
+                   ttl: Optional[float] = None) -> Any:
+        """Return the value for key, storing factory() on a miss.
+        Concurrent misses on one key run factory() once; the others
+        wait for its value (or, if it raises, try again themselves).
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            inflight = self._inflight.setdefault(key, [threading.Lock(), 0])
+            inflight[1] += 1
+        try:
+            with inflight[0]:
+                with self._lock:
+                    value = self._lookup(key, _MISSING, count=False)
+                if value is _MISSING:
+                    value = factory()
+                    self.set(key, value, ttl)
+                return value
+        finally:
+            with self._lock:
+                inflight[1] -= 1
+                if not inflight[1]:
+                    del self._inflight[key]
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop key if present"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every entry and reset the statistics"""
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = 0
+            self._evictions = self._expirations = 0
+
+    def cache_info(self) -> CacheInfo:
+        """Hits, misses, evictions, expirations and sizes"""
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._evictions,
+                             self._expirations, self.maxsize,
+                             len(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _MemoCell:
+    """Per-instance memo state: a lock and a (value, expires) entry"""
+    __slots__ = ("lock", "entry")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.entry: Optional[Tuple[Any, Optional[float]]] = None
+
+
+class _MemoizedProperty(property):
+    """Property returned by memoize; see memoize for the semantics"""
+
+    def __init__(self, fn: Callable, ttl: Optional[float] = None) -> None:
+        super().__init__(self._get, doc=fn.__doc__)
+        self.fn = fn
+        self.ttl = ttl
+        self.attr_name = "_{}".format(fn.__name__)
+        self._guard = threading.Lock()
+        # id(obj) -> cell for instances that can't hold the cell as an
+        # attribute; by identity, as equal instances must not share
+        self._cells: Dict[int, _MemoCell] = {}
+        wraps(fn)(self)
+
+    def _cell(self, obj: Any, create: bool = True) -> Optional[_MemoCell]:
+        """Find, or create, the memo cell of obj"""
+        cell = getattr(obj, self.attr_name, None)
+        if not isinstance(cell, _MemoCell):
+            cell = self._cells.get(id(obj))
+        if cell is not None or not create:
+            return cell
+        with self._guard:
+            cell = self._cell(obj, create=False)
+            if cell is None:
+                cell = _MemoCell()
+                try:
+                    setattr(obj, self.attr_name, cell)
+                except AttributeError:
+                    try:
+                        # Drop the cell when obj dies, before its id is reused
+                        weakref.finalize(obj, self._cells.pop, id(obj), None)
+                        self._cells[id(obj)] = cell
+                    except TypeError:
+                        raise TypeError(
+                            "memoize needs a __dict__, a {!r} slot or a "
+                            "__weakref__ slot on {}".format(
+                                self.attr_name, type(obj).__name__)
+                        ) from None
+        return cell
+
+    def _get(self, obj: Any) -> Any:
+        """Return the memoized value, computing it at most once at a time"""
+        cell = self._cell(obj)
+        entry = cell.entry
+        if entry is not None and (entry[1] is None
+                                  or time.monotonic() < entry[1]):
+            return entry[0]
+        with cell.lock:
+            # Another thread may have computed it while we waited
+            entry = cell.entry
+            if entry is not None and (entry[1] is None
+                                      or time.monotonic() < entry[1]):
+                return entry[0]
+            value = self.fn(obj)
+            expires = None
+            if self.ttl is not None:
+                expires = time.monotonic() + self.ttl
+            cell.entry = (value, expires)
+            return value
+
+    def invalidate(self, obj: Any) -> None:
+        """Forget obj's memoized value so the next access recomputes it"""
+        cell = self._cell(obj, create=False)
+        if cell is not None:
+            cell.entry = None
+
+
+def memoize(fn: Optional[Callable] = None, *,
+            ttl: Optional[float] = None) -> Callable:
     """Decorator to memoize a method.
+    The method becomes a property whose value is computed on first
+    access and then reused; with ``ttl`` it is recomputed once it is
+    older than ``ttl`` seconds. Concurrent first accesses on the same
+    instance compute it only once. ``Class.method.invalidate(obj)``
+    drops obj's value. Works on slotted classes that have a
+    ``__weakref__`` slot or a ``_<method name>`` slot.
     Example
     -------
     class MyClass:
@@ -63,13 +831,6 @@ def memoize(fn: Callable) -> Callable:
     >>> my_object.a_method
     42
     """
-    attr_name = "_{}".format(fn.__name__)
-
-    @wraps(fn)
-    def memoized(self):
-        """"memoized wraps"""
-        if not hasattr(self, attr_name):
-            setattr(self, attr_name, fn(self))
-        return getattr(self, attr_name)
-
-    return property(memoized)
+    if fn is None:
+        return lambda fn: _MemoizedProperty(fn, ttl)
+    return _MemoizedProperty(fn, ttl)
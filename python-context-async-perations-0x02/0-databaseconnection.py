@@ -1,58 +1,109 @@
 import sqlite3
 import os
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Recommended SQLite settings for concurrent readers and writers
+DEFAULT_PROFILE = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 268435456,  # 256 MiB
+    'cache_size': -65536,  # negative means KiB, i.e. 64 MiB
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,  # milliseconds
+}
+
+SAMPLE_USERS = [
+    ("Alice", 25),
+    ("Bob", 30),
+    ("Charlie", 35),
+    ("Diana", 45),
+    ("Eve", 28)
+]
+
+# Database files whose schema has already been bootstrapped by this process
+_bootstrapped = set()
+_bootstrap_lock = threading.Lock()
+
+def apply_profile(connection, profile):
+    """Apply the PRAGMA settings of a connection profile to a connection"""
+    for pragma, value in (profile or {}).items():
+        connection.execute(f"PRAGMA {pragma} = {value}")
+
+def bootstrap_database(connection, db_name):
+    """Create the users table and sample data, once per database file per process"""
+    # Every ':memory:' connection is a separate database, so it always needs bootstrapping
+    key = None if db_name == ":memory:" else os.path.abspath(db_name)
+    with _bootstrap_lock:
+        if key is not None and key in _bootstrapped:
+            return
+        cursor = connection.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                age INTEGER NOT NULL
+            )
+        ''')
+
+        # Insert sample data if table is empty
+        cursor.execute("SELECT COUNT(*) FROM users")
+        if cursor.fetchone()[0] == 0:
+            cursor.executemany("INSERT INTO users (name, age) VALUES (?, ?)", SAMPLE_USERS)
+            connection.commit()
+            logger.info("Sample data inserted into users table")
+        cursor.close()
+        if key is not None:
+            _bootstrapped.add(key)
 
 class DatabaseConnection:
     """Custom class-based context manager for database connections"""
-    
-    def __init__(self, db_name="example.db"):
+
+    def __init__(self, db_name="example.db", profile=None, verbose=False):
         self.db_name = db_name
+        self.profile = profile
+        self.verbose = verbose
         self.connection = None
         self.cursor = None
-    
+
+    def _log(self, message):
+        """Log lifecycle messages at INFO when verbose, DEBUG otherwise"""
+        logger.log(logging.INFO if self.verbose else logging.DEBUG, message)
+
+    def _open_connection(self):
+        connection = sqlite3.connect(self.db_name)
+        apply_profile(connection, self.profile)
+        return connection
+
+    def _close_connection(self, connection):
+        connection.close()
+
     def __enter__(self):
         """Enter the context - open database connection"""
-        print(f"Opening database connection to {self.db_name}")
-        self.connection = sqlite3.connect(self.db_name)
+        self._log(f"Opening database connection to {self.db_name}")
+        self.connection = self._open_connection()
+        bootstrap_database(self.connection, self.db_name)
         self.cursor = self.connection.cursor()
-        
-        # Create users table if it doesn't exist and add sample data
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL,
-                age INTEGER NOT NULL
-            )
-        ''')
-        
-        # Insert sample data if table is empty
-        self.cursor.execute("SELECT COUNT(*) FROM users")
-        if self.cursor.fetchone()[0] == 0:
-            sample_users = [
-                ("Alice", 25),
-                ("Bob", 30),
-                ("Charlie", 35),
-                ("Diana", 45),
-                ("Eve", 28)
-            ]
-            self.cursor.executemany("INSERT INTO users (name, age) VALUES (?, ?)", sample_users)
-            self.connection.commit()
-            print("Sample data inserted into users table")
-        
         return self
-    
+
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Exit the context - close database connection"""
         if self.cursor:
             self.cursor.close()
+            self.cursor = None
         if self.connection:
-            self.connection.close()
-        print("Database connection closed")
-        
+            self._close_connection(self.connection)
+            self.connection = None
+        self._log("Database connection closed")
+
         # Handle exceptions
         if exc_type is not None:
-            print(f"An exception occurred: {exc_type.__name__}: {exc_val}")
+            self._log(f"An exception occurred: {exc_type.__name__}: {exc_val}")
         return False  # Don't suppress exceptions
-    
+
     def execute_query(self, query, params=None):
         """Execute a query and return results"""
         if params:
@@ -61,22 +112,97 @@ class DatabaseConnection:
             self.cursor.execute(query)
         return self.cursor.fetchall()
 
+class ConnectionPool:
+    """Thread-safe pool of idle SQLite connections to one database file"""
+
+    def __init__(self, db_name, profile=None, max_idle=8):
+        self.db_name = db_name
+        self.profile = profile
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Borrow an idle connection, or open one (profile applied once, here)"""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        connection = sqlite3.connect(self.db_name, check_same_thread=False)
+        apply_profile(connection, self.profile)
+        return connection
+
+    def release(self, connection):
+        """Return a connection, discarding any transaction left open"""
+        if connection.in_transaction:
+            connection.rollback()
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def close(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+class PooledDatabaseConnection(DatabaseConnection):
+    """DatabaseConnection that borrows connections from a shared pool per database file"""
+
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    @classmethod
+    def get_pool(cls, db_name, profile=None):
+        """Return the shared pool for a database file and profile"""
+        key = (os.path.abspath(db_name), tuple(sorted((profile or {}).items())))
+        with cls._pools_lock:
+            pool = cls._pools.get(key)
+            if pool is None:
+                pool = cls._pools[key] = ConnectionPool(db_name, profile)
+            return pool
+
+    def __init__(self, db_name="example.db", profile=DEFAULT_PROFILE, verbose=False):
+        if db_name == ":memory:":
+            raise ValueError("PooledDatabaseConnection needs a database file; each ':memory:' connection is separate")
+        super().__init__(db_name, profile, verbose)
+        self.pool = self.get_pool(db_name, profile)
+
+    def _open_connection(self):
+        return self.pool.acquire()
+
+    def _close_connection(self, connection):
+        self.pool.release(connection)
+
 # Using the context manager
 def main():
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     print("=== Custom Database Connection Context Manager ===\n")
-    
+
     # Use the context manager with the 'with' statement
-    with DatabaseConnection() as db:
+    with DatabaseConnection(verbose=True) as db:
         print("Executing query: SELECT * FROM users")
         results = db.execute_query("SELECT * FROM users")
-        
+
         print("\nQuery Results:")
         print("ID | Name    | Age")
         print("-" * 20)
         for row in results:
             print(f"{row[0]:2} | {row[1]:7} | {row[2]}")
-    
+
     print("\nContext manager demonstration completed!")
 
+    # Tight loops: fresh connection per block vs. pooled connections
+    print("\n=== Fresh vs. Pooled Connections (1000 'with' blocks) ===")
+    for label, manager in [("fresh", DatabaseConnection), ("pooled", PooledDatabaseConnection)]:
+        start = time.perf_counter()
+        for _ in range(1000):
+            with manager() as db:
+                db.execute_query("SELECT age FROM users WHERE id = ?", (1,))
+        elapsed = time.perf_counter() - start
+        print(f"{label:7}: {elapsed * 1000:.1f} µs per block")
+
 if __name__ == "__main__":
     main()
@@ -1,58 +1,94 @@
 import sqlite3
 import os
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_USERS = [
+    ("Alice", 25),
+    ("Bob", 30),
+    ("Charlie", 35),
+    ("Diana", 45),
+    ("Eve", 28),
+    ("Frank", 50),
+    ("Grace", 22),
+    ("Henry", 60)
+]
+
+# Database files whose schema has already been bootstrapped by this process
+_bootstrapped = set()
+_bootstrap_lock = threading.Lock()
+
+def bootstrap_database(connection, db_name):
+    """Create the users table and sample data, once per database file per process"""
+    key = None if db_name == ":memory:" else os.path.abspath(db_name)
+    with _bootstrap_lock:
+        if key is not None and key in _bootstrapped:
+            return
+        cursor = connection.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                age INTEGER NOT NULL
+            )
+        ''')
+
+        # Insert sample data if table is empty
+        cursor.execute("SELECT COUNT(*) FROM users")
+        if cursor.fetchone()[0] == 0:
+            cursor.executemany("INSERT INTO users (name, age) VALUES (?, ?)", SAMPLE_USERS)
+            connection.commit()
+            logger.info("Sample data inserted into users table")
+        cursor.close()
+        if key is not None:
+            _bootstrapped.add(key)
 
 class ExecuteQuery:
     """Reusable context manager that takes a query as input and executes it"""
     
-    def __init__(self, db_name="example.db", query=None, params=None):
+    def __init__(self, db_name="example.db", query=None, params=None,
+                 stream=False, chunk_size=1000, columnar=False,
+                 connection=None, verbose=False):
+        """With stream=True the query is not fetched up front: iterate the
+        context manager (rows) or iter_chunks() (lists of up to chunk_size rows,
+        or per-column lists when columnar=True) inside the 'with' block.
+        An existing ``connection`` is used as-is and left open on exit."""
         self.db_name = db_name
         self.query = query
         self.params = params or []
-        self.connection = None
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.columnar = columnar
+        self.verbose = verbose
+        self.owns_connection = connection is None
+        self.connection = connection
         self.cursor = None
         self.results = None
+
+    def _log(self, message):
+        """Log lifecycle messages at INFO when verbose, DEBUG otherwise"""
+        logger.log(logging.INFO if self.verbose else logging.DEBUG, message)
     
     def __enter__(self):
         """Enter the context - open connection and execute query"""
-        print(f"Opening database connection to {self.db_name}")
-        self.connection = sqlite3.connect(self.db_name)
+        if self.owns_connection:
+            self._log(f"Opening database connection to {self.db_name}")
+            self.connection = sqlite3.connect(self.db_name)
+        bootstrap_database(self.connection, self.db_name)
         self.cursor = self.connection.cursor()
         
-        # Create users table if it doesn't exist and add sample data
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL,
-                age INTEGER NOT NULL
-            )
-        ''')
-        
-        # Insert sample data if table is empty
-        self.cursor.execute("SELECT COUNT(*) FROM users")
-        if self.cursor.fetchone()[0] == 0:
-            sample_users = [
-                ("Alice", 25),
-                ("Bob", 30),
-                ("Charlie", 35),
-                ("Diana", 45),
-                ("Eve", 28),
-                ("Frank", 50),
-                ("Grace", 22),
-                ("Henry", 60)
-            ]
-            self.cursor.executemany("INSERT INTO users (name, age) VALUES (?, ?)", sample_users)
-            self.connection.commit()
-            print("Sample data inserted into users table")
-        
         # Execute the provided query
         if self.query:
-            print(f"Executing query: {self.query}")
+            self._log(f"Executing query: {self.query}")
             if self.params:
-                print(f"With parameters: {self.params}")
+                self._log(f"With parameters: {self.params}")
                 self.cursor.execute(self.query, self.params)
             else:
                 self.cursor.execute(self.query)
-            self.results = self.cursor.fetchall()
+            if not self.stream:
+                self.results = self.cursor.fetchall()
         
         return self
     
@@ -60,27 +96,57 @@ class ExecuteQuery:
         """Exit the context - close database connection"""
         if self.cursor:
             self.cursor.close()
-        if self.connection:
+            self.cursor = None
+        if self.connection and self.owns_connection:
             self.connection.close()
-        print("Database connection closed")
+            self.connection = None
+            self._log("Database connection closed")
         
         # Handle exceptions
         if exc_type is not None:
-            print(f"An exception occurred: {exc_type.__name__}: {exc_val}")
+            self._log(f"An exception occurred: {exc_type.__name__}: {exc_val}")
         return False  # Don't suppress exceptions
     
     def get_results(self):
         """Return the query results"""
         return self.results
 
+    def columns(self):
+        """Return the column names of the executed query"""
+        return [column[0] for column in self.cursor.description]
+
+    def iter_chunks(self):
+        """Yield the result set in fetchmany chunks, valid only inside the 'with' block"""
+        if not self.stream:
+            raise RuntimeError("iter_chunks() requires ExecuteQuery(..., stream=True)")
+        while True:
+            # Checked every chunk: the iterator may outlive the 'with' block
+            if self.cursor is None:
+                raise RuntimeError("Query results are only available inside the 'with' block")
+            rows = self.cursor.fetchmany(self.chunk_size)
+            if not rows:
+                return
+            if self.columnar:
+                yield dict(zip(self.columns(), (list(column) for column in zip(*rows))))
+            else:
+                yield rows
+
+    def __iter__(self):
+        """Iterate rows one by one while holding at most one chunk in memory"""
+        if self.columnar:
+            raise RuntimeError("Iterate iter_chunks() for columnar results")
+        for rows in self.iter_chunks():
+            yield from rows
+
 def main():
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     print("=== Reusable Query Context Manager ===\n")
     
     # Use the context manager with a specific query and parameter
     query = "SELECT * FROM users WHERE age > ?"
     parameter = 25
     
-    with ExecuteQuery(query=query, params=[parameter]) as executor:
+    with ExecuteQuery(query=query, params=[parameter], verbose=True) as executor:
         results = executor.get_results()
         
         print(f"\nResults for users older than {parameter}:")
@@ -96,7 +162,7 @@ def main():
     query2 = "SELECT name, age FROM users WHERE age BETWEEN ? AND ?"
     params2 = [30, 50]
     
-    with ExecuteQuery(query=query2, params=params2) as executor:
+    with ExecuteQuery(query=query2, params=params2, verbose=True) as executor:
         results2 = executor.get_results()
         
         print(f"\nResults for users aged between {params2[0]} and {params2[1]}:")
@@ -105,5 +171,13 @@ def main():
         for row in results2:
             print(f"{row[0]:7} | {row[1]}")
 
+    # Stream a result set in chunks instead of materializing it
+    print("\n" + "="*50)
+    with ExecuteQuery(query="SELECT name, age FROM users", stream=True,
+                      chunk_size=3, columnar=True) as executor:
+        print("\nStreaming users in column chunks of 3:")
+        for chunk in executor.iter_chunks():
+            print(f"names={chunk['name']} ages={chunk['age']}")
+
 if __name__ == "__main__":
     main()
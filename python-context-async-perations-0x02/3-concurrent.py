@@ -1,10 +1,82 @@
 import asyncio
+import contextlib
 import aiosqlite
 import os
 
-async def setup_database():
+QueryScheduler = __import__('4-query_scheduler').QueryScheduler
+
+DB_NAME = "async_example.db"
+
+class AsyncConnectionPool:
+    """Bounded pool of aiosqlite connections.
+
+    Every aiosqlite connection runs on its own thread, so the pool size also
+    caps the number of database threads, however many coroutines are waiting.
+    """
+
+    def __init__(self, db_name=DB_NAME, size=5, acquire_timeout=5.0, **connect_kwargs):
+        """Extra keyword arguments (e.g. uri=True) are passed to aiosqlite.connect"""
+        self.db_name = db_name
+        self.connect_kwargs = connect_kwargs
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self._semaphore = asyncio.Semaphore(size)
+        self._idle = []
+        self._closed = False
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        """Borrow a connection; raises asyncio.TimeoutError after acquire_timeout seconds"""
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise asyncio.TimeoutError(
+                f"No connection to {self.db_name} available within {self.acquire_timeout}s") from None
+        db = None
+        try:
+            db = self._idle.pop() if self._idle else await aiosqlite.connect(self.db_name, **self.connect_kwargs)
+            yield db
+        finally:
+            try:
+                if db is not None:
+                    if db.in_transaction:
+                        await db.rollback()
+                    if self._closed:
+                        await db.close()
+                    else:
+                        self._idle.append(db)
+            finally:
+                self._semaphore.release()
+
+    async def close(self):
+        """Close idle connections; borrowed ones are closed when returned"""
+        self._closed = True
+        idle, self._idle = self._idle, []
+        for db in idle:
+            await db.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+        return False
+
+@contextlib.asynccontextmanager
+async def connection(pool=None):
+    """Borrow a connection from ``pool``, or open a one-off connection without one"""
+    if pool is None:
+        async with aiosqlite.connect(DB_NAME) as db:
+            yield db
+    else:
+        async with pool.acquire() as db:
+            yield db
+
+async def setup_database(pool=None):
     """Setup the database with sample data"""
-    async with aiosqlite.connect("async_example.db") as db:
+    async with connection(pool) as db:
         # Create users table
         await db.execute('''
             CREATE TABLE IF NOT EXISTS users (
@@ -36,11 +108,11 @@ async def setup_database():
             await db.commit()
             print("Sample data inserted into async database")
 
-async def async_fetch_users():
+async def async_fetch_users(pool=None):
     """Asynchronously fetch all users"""
     print("Starting to fetch all users...")
     
-    async with aiosqlite.connect("async_example.db") as db:
+    async with connection(pool) as db:
         # Simulate some processing time
         await asyncio.sleep(0.1)
         
@@ -50,11 +122,11 @@ async def async_fetch_users():
         print(f"Fetched {len(users)} users")
         return users
 
-async def async_fetch_older_users():
+async def async_fetch_older_users(pool=None):
     """Asynchronously fetch users older than 40"""
     print("Starting to fetch users older than 40...")
     
-    async with aiosqlite.connect("async_example.db") as db:
+    async with connection(pool) as db:
         # Simulate some processing time
         await asyncio.sleep(0.15)
         
@@ -65,26 +137,28 @@ async def async_fetch_older_users():
         return older_users
 
 async def fetch_concurrently():
-    """Execute both queries concurrently using asyncio.gather"""
+    """Execute both queries concurrently through a bounded QueryScheduler"""
     print("=== Concurrent Asynchronous Database Queries ===\n")
     
-    # Setup database first
-    await setup_database()
-    
-    print("Executing queries concurrently...\n")
-    
-    # Record start time
-    start_time = asyncio.get_event_loop().time()
-    
-    # Use asyncio.gather to run both queries concurrently
-    all_users, older_users = await asyncio.gather(
-        async_fetch_users(),
-        async_fetch_older_users()
-    )
-    
-    # Record end time
-    end_time = asyncio.get_event_loop().time()
-    execution_time = end_time - start_time
+    async with AsyncConnectionPool() as pool:
+        # Setup database first
+        await setup_database(pool)
+        
+        print("Executing queries concurrently...\n")
+        
+        # Record start time
+        start_time = asyncio.get_event_loop().time()
+        
+        # Run both queries concurrently, never more at once than the pool can serve
+        scheduler = QueryScheduler(max_concurrency=pool.size, default_timeout=10.0)
+        all_users, older_users = await asyncio.gather(
+            scheduler.submit(lambda: async_fetch_users(pool)),
+            scheduler.submit(lambda: async_fetch_older_users(pool))
+        )
+        
+        # Record end time
+        end_time = asyncio.get_event_loop().time()
+        execution_time = end_time - start_time
     
     print(f"\nBoth queries completed in {execution_time:.3f} seconds")
     
@@ -106,7 +180,11 @@ async def fetch_concurrently():
     return all_users, older_users
 
 async def demonstrate_sequential_vs_concurrent():
-    """Demonstrate the difference between sequential and concurrent execution"""
+    """Demonstrate the difference between sequential and concurrent execution
+
+    The timings are dominated by the simulated sleeps in the fetch functions;
+    run 5-benchmark.py to measure real database throughput and latency.
+    """
     print("\n" + "="*60)
     print("PERFORMANCE COMPARISON: Sequential vs Concurrent")
     print("="*60)
@@ -0,0 +1,159 @@
+import asyncio
+import heapq
+import itertools
+
+
+class QueryScheduler:
+    """Run async query coroutines with a concurrency limit, priorities and deadlines.
+
+    Lower priority numbers run first; equal priorities run in submission order.
+    A query whose deadline passes while queued fails without running, and one
+    still running at its deadline is cancelled, so slow queries free their slot.
+    """
+
+    def __init__(self, max_concurrency=10, default_timeout=None):
+        self.max_concurrency = max_concurrency
+        self.default_timeout = default_timeout
+        self._queue = []
+        self._sequence = itertools.count()
+        self._running = 0
+        self._tasks = set()
+        # Set whenever nothing is queued or running; shared by every join()
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def submit(self, query_factory, priority=0, timeout=None, name=None):
+        """Schedule ``query_factory()`` and return a future for its result.
+
+        ``query_factory`` is a zero-argument callable returning a coroutine, so
+        the coroutine is only created once a slot is free. ``timeout`` (seconds
+        from now, falling back to default_timeout) covers queueing and running.
+        """
+        loop = asyncio.get_running_loop()
+        timeout = timeout if timeout is not None else self.default_timeout
+        job = {
+            'factory': query_factory,
+            'future': loop.create_future(),
+            'deadline': loop.time() + timeout if timeout is not None else None,
+            'name': name or getattr(query_factory, '__name__', 'query'),
+            'task': None,
+            'timer': None,
+        }
+        job['future'].add_done_callback(lambda future: self._on_future_done(job))
+        if job['deadline'] is not None:
+            job['timer'] = loop.call_at(job['deadline'], self._expire, job)
+        self._idle.clear()
+        heapq.heappush(self._queue, (priority, next(self._sequence), job))
+        self._dispatch()
+        return job['future']
+
+    def _on_future_done(self, job):
+        # A finished job no longer needs its deadline timer
+        if job['timer'] is not None:
+            job['timer'].cancel()
+        # Cancelling the returned future cancels the running query too
+        if job['future'].cancelled() and job['task'] is not None:
+            job['task'].cancel()
+
+    def _expire(self, job):
+        # Fail a query that is still queued when its deadline passes
+        if job['task'] is None and not job['future'].done():
+            job['future'].set_exception(
+                asyncio.TimeoutError(f"{job['name']} missed its deadline while queued"))
+
+    def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while self._running < self.max_concurrency and self._queue:
+            _, _, job = heapq.heappop(self._queue)
+            if job['future'].done():
+                continue
+            remaining = None
+            if job['deadline'] is not None:
+                remaining = job['deadline'] - loop.time()
+                if remaining <= 0:
+                    job['future'].set_exception(
+                        asyncio.TimeoutError(f"{job['name']} missed its deadline while queued"))
+                    continue
+            self._running += 1
+            task = loop.create_task(self._run(job, remaining))
+            job['task'] = task
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if self._running == 0 and not self._queue:
+            self._idle.set()
+
+    async def _run(self, job, remaining):
+        future = job['future']
+        try:
+            result = await asyncio.wait_for(job['factory'](), remaining)
+        except asyncio.TimeoutError:
+            if not future.done():
+                future.set_exception(asyncio.TimeoutError(f"{job['name']} timed out after running"))
+        except asyncio.CancelledError:
+            if not future.done():
+                future.cancel()
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+        finally:
+            self._running -= 1
+            self._dispatch()
+
+    async def stream(self, query_factories, priority=0, timeout=None, return_exceptions=False):
+        """Yield ``(index, result)`` pairs as queries finish, fastest first"""
+        futures = [self.submit(factory, priority=priority, timeout=timeout)
+                   for factory in query_factories]
+
+        async def indexed(index, future):
+            try:
+                return index, await future
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                return index, e
+
+        pending = [indexed(index, future) for index, future in enumerate(futures)]
+        try:
+            for next_done in asyncio.as_completed(pending):
+                yield await next_done
+        finally:
+            for future in futures:
+                future.cancel()
+
+    async def join(self):
+        """Wait until every submitted query has finished"""
+        await self._idle.wait()
+
+    @property
+    def pending(self):
+        return len(self._queue)
+
+    @property
+    def running(self):
+        return self._running
+
+
+async def demo():
+    """Show priorities, deadlines and streaming with simulated queries"""
+    scheduler = QueryScheduler(max_concurrency=2)
+
+    async def query(name, seconds):
+        await asyncio.sleep(seconds)
+        return name
+
+    print("=== Bounded Query Scheduler ===\n")
+    durations = [0.1, 0.05, 0.5, 0.02, 0.15, 0.05]
+    factories = [lambda i=i, seconds=seconds: query(f"query-{i}", seconds)
+                 for i, seconds in enumerate(durations)]
+    async for index, result in scheduler.stream(factories, timeout=0.3, return_exceptions=True):
+        print(f"query {index}: {result!r}")
+
+    urgent = scheduler.submit(lambda: query("urgent", 0.01), priority=-1)
+    print(f"\nHigh-priority query: {await urgent}")
+
+
+if __name__ == "__main__":
+    asyncio.run(demo())
@@ -0,0 +1,216 @@
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+AsyncConnectionPool = __import__('3-concurrent').AsyncConnectionPool
+
+ROWS = 10000
+WORKLOADS = ("point", "range", "write")
+STORAGES = ("file", "memory")
+MODES = ("sync", "threads", "asyncio")
+
+_memory_ids = itertools.count()
+
+
+def make_operation(workload, rng):
+    """Return the (sql, params) pair for one operation of a workload"""
+    if workload == "point":
+        return "SELECT * FROM users WHERE id = ?", (rng.randint(1, ROWS),)
+    if workload == "range":
+        low = rng.randint(18, 75)
+        return "SELECT * FROM users WHERE age BETWEEN ? AND ? LIMIT 100", (low, low + 5)
+    return "UPDATE users SET age = ? WHERE id = ?", (rng.randint(18, 80), rng.randint(1, ROWS))
+
+
+class Recorder:
+    """Collects per-operation latencies, errors and the peak thread count"""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.peak_threads = threading.active_count()
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.latencies.append(seconds)
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+
+    def error(self):
+        with self._lock:
+            self.errors += 1
+
+    def summary(self, elapsed):
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction):
+            if not latencies:
+                return float("nan")
+            return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000
+
+        return {
+            "ops_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(0.50),
+            "p99_ms": percentile(0.99),
+            "errors": self.errors,
+            "peak_threads": self.peak_threads,
+        }
+
+
+class Storage:
+    """A benchmark database, either a temporary file or a shared in-memory database"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self._tmp = None
+        if kind == "file":
+            self._tmp = tempfile.TemporaryDirectory()
+            self.database = os.path.join(self._tmp.name, "bench.db")
+            self.uri = False
+        else:
+            self.database = f"file:bench{next(_memory_ids)}?mode=memory&cache=shared"
+            self.uri = True
+        # Keeps a shared in-memory database alive; also used to seed it
+        self._keeper = self.connect()
+        if kind == "file":
+            self._keeper.execute("PRAGMA journal_mode = WAL")
+        self._keeper.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT NOT NULL, age INTEGER NOT NULL)")
+        self._keeper.execute("CREATE INDEX idx_users_age ON users (age)")
+        rng = random.Random(0)
+        self._keeper.executemany("INSERT INTO users (name, age) VALUES (?, ?)",
+                                 ((f"user{i}", rng.randint(18, 80)) for i in range(ROWS)))
+        self._keeper.commit()
+
+    def connect(self, **kwargs):
+        return sqlite3.connect(self.database, uri=self.uri, timeout=5.0, **kwargs)
+
+    def close(self):
+        self._keeper.close()
+        if self._tmp is not None:
+            self._tmp.cleanup()
+
+
+def run_operation(connection, workload, rng, recorder):
+    sql, params = make_operation(workload, rng)
+    start = time.perf_counter()
+    try:
+        rows = connection.execute(sql, params).fetchall()
+        if workload == "write":
+            connection.commit()
+    except sqlite3.OperationalError:
+        connection.rollback()
+        recorder.error()
+        return
+    recorder.record(time.perf_counter() - start)
+    return rows
+
+
+def run_sync(storage, workload, operations, concurrency, recorder):
+    """One connection on the calling thread; concurrency is always 1"""
+    connection = storage.connect()
+    rng = random.Random(1)
+    try:
+        for _ in range(operations):
+            run_operation(connection, workload, rng, recorder)
+    finally:
+        connection.close()
+
+
+def run_threads(storage, workload, operations, concurrency, recorder):
+    """A ThreadPoolExecutor with one connection per worker thread"""
+    local = threading.local()
+    connections = []
+    connections_lock = threading.Lock()
+
+    def worker(seed):
+        if not hasattr(local, "connection"):
+            local.connection = storage.connect(check_same_thread=False)
+            with connections_lock:
+                connections.append(local.connection)
+        rng = random.Random(seed)
+        for _ in range(operations // concurrency):
+            run_operation(local.connection, workload, rng, recorder)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    for connection in connections:
+        connection.close()
+
+
+async def run_asyncio(storage, workload, operations, concurrency, recorder):
+    """aiosqlite connections from an AsyncConnectionPool of size ``concurrency``"""
+    pool = AsyncConnectionPool(storage.database, size=concurrency, acquire_timeout=30.0,
+                               uri=storage.uri, timeout=5.0)
+
+    async def worker(seed):
+        rng = random.Random(seed)
+        for _ in range(operations // concurrency):
+            sql, params = make_operation(workload, rng)
+            async with pool.acquire() as db:
+                start = time.perf_counter()
+                try:
+                    async with db.execute(sql, params) as cursor:
+                        await cursor.fetchall()
+                    if workload == "write":
+                        await db.commit()
+                except sqlite3.OperationalError:
+                    await db.rollback()
+                    recorder.error()
+                    continue
+                recorder.record(time.perf_counter() - start)
+
+    try:
+        await asyncio.gather(*(worker(seed) for seed in range(concurrency)))
+    finally:
+        await pool.close()
+
+
+def benchmark(storage_kind, mode, workload, operations, concurrency):
+    """Run one configuration and return its summary"""
+    storage = Storage(storage_kind)
+    recorder = Recorder()
+    try:
+        start = time.perf_counter()
+        if mode == "sync":
+            run_sync(storage, workload, operations, concurrency, recorder)
+        elif mode == "threads":
+            run_threads(storage, workload, operations, concurrency, recorder)
+        else:
+            asyncio.run(run_asyncio(storage, workload, operations, concurrency, recorder))
+        elapsed = time.perf_counter() - start
+    finally:
+        storage.close()
+    return recorder.summary(elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sync, thread-pool and asyncio SQLite access")
+    parser.add_argument("--operations", type=int, default=2000, help="operations per configuration")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument("--storages", nargs="+", choices=STORAGES, default=list(STORAGES))
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    print(f"{'storage':7} {'workload':8} {'mode':8} {'conc':>4} {'ops/s':>10} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'errors':>6} {'threads':>7}")
+    for storage_kind in args.storages:
+        for workload in args.workloads:
+            for mode in args.modes:
+                levels = [1] if mode == "sync" else args.concurrency
+                for concurrency in levels:
+                    result = benchmark(storage_kind, mode, workload, args.operations, concurrency)
+                    print(f"{storage_kind:7} {workload:8} {mode:8} {concurrency:4} "
+                          f"{result['ops_per_sec']:10.0f} {result['p50_ms']:8.3f} {result['p99_ms']:8.3f} "
+                          f"{result['errors']:6} {result['peak_threads']:7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ExecuteQuery = __import__('1-execute').ExecuteQuery
+
+
+class ThreadedQueryExecutor:
+    """Run ExecuteQuery workloads concurrently on a ThreadPoolExecutor.
+
+    Each worker thread lazily opens one connection and reuses it for every
+    query it runs, so existing sync code gets concurrency without aiosqlite.
+    submit() returns a concurrent.futures.Future and run() an awaitable.
+    """
+
+    def __init__(self, db_name="example.db", max_workers=4, profile=None):
+        self.db_name = db_name
+        self.profile = profile
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="query-worker")
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # shutdown() closes it from the calling thread, hence check_same_thread=False
+            connection = sqlite3.connect(self.db_name, check_same_thread=False)
+            for pragma, value in (self.profile or {}).items():
+                connection.execute(f"PRAGMA {pragma} = {value}")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    def _execute(self, query, params):
+        connection = self._connection()
+        try:
+            with ExecuteQuery(self.db_name, query, params, connection=connection) as executor:
+                results = executor.get_results()
+            if connection.in_transaction:
+                connection.commit()
+        except Exception:
+            # Don't leave the write lock held, or let the next query commit this one
+            if connection.in_transaction:
+                connection.rollback()
+            raise
+        return results
+
+    def submit(self, query, params=None):
+        """Schedule a query on a worker thread and return a Future of its rows"""
+        return self._executor.submit(self._execute, query, params)
+
+    def run(self, query, params=None):
+        """Schedule a query and return an awaitable for use inside a running event loop"""
+        return asyncio.wrap_future(self.submit(query, params))
+
+    def map(self, queries):
+        """Run ``(query, params)`` pairs concurrently and return their rows in order"""
+        futures = [self.submit(query, params) for query, params in queries]
+        return [future.result() for future in futures]
+
+    def shutdown(self, wait=True):
+        """Stop the workers and close their connections"""
+        self._executor.shutdown(wait=wait)
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+        return False
+
+
+def main():
+    print("=== Thread-Pool Query Executor ===\n")
+    queries = [("SELECT * FROM users WHERE age > ?", [age]) for age in range(20, 60)] * 25
+
+    start = time.perf_counter()
+    for query, params in queries:
+        with ExecuteQuery(query=query, params=params) as executor:
+            executor.get_results()
+    sequential_time = time.perf_counter() - start
+
+    with ThreadedQueryExecutor(max_workers=4) as pool:
+        start = time.perf_counter()
+        results = pool.map(queries)
+        threaded_time = time.perf_counter() - start
+
+        async def fetch_two():
+            return await asyncio.gather(
+                pool.run("SELECT * FROM users"),
+                pool.run("SELECT * FROM users WHERE age > ?", [40]),
+            )
+
+        all_users, older_users = asyncio.run(fetch_two())
+
+    print(f"{len(queries)} queries, new connection each: {sequential_time:.3f}s")
+    print(f"{len(results)} queries, 4 worker threads:   {threaded_time:.3f}s")
+    print(f"Awaited from asyncio: {len(all_users)} users, {len(older_users)} older than 40")
+
+
+if __name__ == "__main__":
+    main()
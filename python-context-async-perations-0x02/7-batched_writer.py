@@ -0,0 +1,179 @@
+import asyncio
+import contextlib
+import os
+import tempfile
+import time
+
+import aiosqlite
+
+concurrent = __import__('3-concurrent')
+
+_STOP = object()
+
+
+class AsyncBatchedWriter:
+    """Buffer rows from async producers and insert them in batched transactions.
+
+    Producers ``await put(row)``; a background task commits up to
+    ``batch_size`` rows per transaction, or whatever arrived within
+    ``flush_interval`` seconds of the first row. When ``max_queue`` rows are
+    waiting, put() blocks (backpressure). close() - or leaving ``async with`` -
+    commits every row accepted so far before returning.
+    """
+
+    def __init__(self, statement="INSERT INTO users (name, age) VALUES (?, ?)", pool=None,
+                 db_name=concurrent.DB_NAME, batch_size=500, flush_interval=0.05, max_queue=10000):
+        self.statement = statement
+        self.pool = pool
+        self.db_name = db_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._task = None
+        self._closed = False
+        self._error = None
+        self.rows_written = 0
+        self.batches_written = 0
+
+    async def start(self):
+        """Start the background flush task"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    async def put(self, row):
+        """Enqueue one row, waiting while the queue is full.
+
+        Starts the flush task on first use, so rows are never queued
+        without something to commit them.
+        """
+        if self._closed:
+            raise RuntimeError("Batched writer is closed")
+        if self._error is not None:
+            raise self._error
+        await self.start()
+        if self._queue.full():
+            await self._wait(self._queue.put(row))
+        else:
+            await self._queue.put(row)
+
+    async def flush(self):
+        """Wait until every row enqueued so far has been committed"""
+        if self._task is None:
+            # Nothing was ever put
+            return
+        await self._wait(self._queue.join())
+
+    async def close(self):
+        """Stop accepting rows, commit everything pending and stop the task"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._task is None:
+            # put() starts the task, so nothing can be queued yet
+            return
+        await self._wait(self._queue.put(_STOP))
+        await self._task
+        if self._error is not None:
+            raise self._error
+
+    async def _wait(self, awaitable):
+        # Don't wait forever on a queue the failed flush task will never drain
+        waiter = asyncio.ensure_future(awaitable)
+        await asyncio.wait([waiter, self._task], return_when=asyncio.FIRST_COMPLETED)
+        if not waiter.done():
+            waiter.cancel()
+        if self._error is not None:
+            raise self._error
+
+    @contextlib.asynccontextmanager
+    async def _connection(self):
+        if self.pool is not None:
+            async with self.pool.acquire() as db:
+                yield db
+        else:
+            async with aiosqlite.connect(self.db_name) as db:
+                yield db
+
+    async def _next_batch(self):
+        """Collect up to batch_size rows; returns (rows, stop_requested)"""
+        row = await self._queue.get()
+        if row is _STOP:
+            return [], True
+        batch = [row]
+        deadline = asyncio.get_running_loop().time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                row = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            if row is _STOP:
+                return batch, True
+            batch.append(row)
+        return batch, False
+
+    async def _run(self):
+        try:
+            async with self._connection() as db:
+                stop = False
+                while not stop:
+                    batch, stop = await self._next_batch()
+                    if batch:
+                        try:
+                            await db.executemany(self.statement, batch)
+                            await db.commit()
+                        except Exception:
+                            await db.rollback()
+                            raise
+                        self.rows_written += len(batch)
+                        self.batches_written += 1
+                    # Count the stop marker as processed too
+                    for _ in range(len(batch) + (1 if stop else 0)):
+                        self._queue.task_done()
+        except Exception as e:
+            self._error = e
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+        return False
+
+
+async def demo():
+    """Ingest rows from many producers into a scratch database"""
+    print("=== Async Batched Writer ===\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "ingest.db")
+        async with aiosqlite.connect(db_name) as db:
+            await db.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT NOT NULL, age INTEGER NOT NULL)")
+            await db.commit()
+
+        producers, rows_each = 20, 2500
+
+        async def produce(writer, producer):
+            for i in range(rows_each):
+                await writer.put((f"user-{producer}-{i}", 18 + i % 60))
+
+        start = time.perf_counter()
+        async with AsyncBatchedWriter(db_name=db_name, batch_size=1000, max_queue=5000) as writer:
+            await asyncio.gather(*(produce(writer, p) for p in range(producers)))
+        elapsed = time.perf_counter() - start
+
+        async with aiosqlite.connect(db_name) as db:
+            async with db.execute("SELECT COUNT(*) FROM users") as cursor:
+                (count,) = await cursor.fetchone()
+
+    print(f"{writer.rows_written} rows in {writer.batches_written} transactions "
+          f"({writer.rows_written / elapsed:.0f} rows/s); {count} rows in the table")
+
+
+if __name__ == "__main__":
+    asyncio.run(demo())
@@ -0,0 +1,166 @@
+import asyncio
+import contextlib
+import os
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import aiosqlite
+
+concurrent = __import__('3-concurrent')
+
+
+def _share_column(values):
+    """Copy a numeric column into a new shared memory block of float64s"""
+    data = array('d', values)
+    block = shared_memory.SharedMemory(create=True, size=max(1, len(data) * data.itemsize))
+    block.buf[:len(data) * data.itemsize] = data.tobytes()
+    return block
+
+
+def _run_chunk(transform, payload):
+    """Worker side: rebuild the chunk and apply the transform"""
+    if payload.get('numeric') is None:
+        return transform(payload['rows'])
+
+    blocks, views = [], {}
+    try:
+        for name, (block_name, length) in payload['numeric'].items():
+            # Pool workers share the parent's resource tracker; the parent unlinks the block
+            block = shared_memory.SharedMemory(name=block_name)
+            blocks.append(block)
+            views[name] = block.buf.cast('d')[:length]
+        columns = dict(payload['columns'])
+        columns.update(views)
+        return transform(columns)
+    finally:
+        for view in views.values():
+            view.release()
+        for block in blocks:
+            block.close()
+
+
+async def process_query(query, transform, params=(), combine=None, pool=None, db_name=concurrent.DB_NAME,
+                        chunk_size=5000, numeric_columns=(), executor=None, max_workers=None,
+                        max_in_flight=None):
+    """Stream a query's rows in chunks to worker processes and gather the results.
+
+    Each chunk of ``chunk_size`` rows is handed to ``transform`` in a
+    ProcessPoolExecutor, keeping CPU-bound work off the event loop. Without
+    ``numeric_columns`` the transform receives a list of rows. With them it
+    receives a dict of column name -> values, where the numeric columns are
+    float64 memoryviews over shared memory (not pickled) and the rest are
+    lists; the views are only valid during the call. ``transform`` and
+    ``combine`` must be picklable module-level functions. At most
+    ``max_in_flight`` chunks (default: two per worker) are in flight, so
+    memory stays bounded. Returns the per-chunk
+    results in order, or ``combine(results)`` if given.
+    """
+    loop = asyncio.get_running_loop()
+    own_executor = executor is None
+    executor = executor or ProcessPoolExecutor(max_workers=max_workers)
+    in_flight = asyncio.Semaphore(max_in_flight or 2 * (max_workers or os.cpu_count() or 1))
+    tasks = []
+    live_blocks = set()
+
+    def unlink(blocks):
+        for block in blocks:
+            if block in live_blocks:
+                live_blocks.discard(block)
+                block.close()
+                block.unlink()
+
+    async def submit(payload, blocks):
+        try:
+            return await loop.run_in_executor(executor, _run_chunk, transform, payload)
+        finally:
+            unlink(blocks)
+            in_flight.release()
+
+    @contextlib.asynccontextmanager
+    async def connection():
+        if pool is not None:
+            async with pool.acquire() as db:
+                yield db
+        else:
+            async with aiosqlite.connect(db_name) as db:
+                yield db
+
+    try:
+        async with connection() as db:
+            async with db.execute(query, params) as cursor:
+                names = [column[0] for column in cursor.description]
+                numeric = [names.index(name) for name in numeric_columns]
+                while True:
+                    rows = await cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    await in_flight.acquire()
+                    blocks = []
+                    if numeric:
+                        payload = {'numeric': {}, 'columns': {}}
+                        for index, name in enumerate(names):
+                            values = [row[index] for row in rows]
+                            if index in numeric:
+                                block = _share_column(values)
+                                live_blocks.add(block)
+                                blocks.append(block)
+                                payload['numeric'][name] = (block.name, len(values))
+                            else:
+                                payload['columns'][name] = values
+                    else:
+                        payload = {'rows': rows}
+                    tasks.append(loop.create_task(submit(payload, blocks)))
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Tasks cancelled before they started never ran their cleanup
+        unlink(list(live_blocks))
+        raise
+    finally:
+        if own_executor:
+            executor.shutdown(wait=False)
+    return combine(results) if combine is not None else results
+
+
+def age_summary(columns):
+    """Per-chunk aggregate over the shared 'age' column: (count, total, min, max)"""
+    ages = columns['age']
+    return len(ages), sum(ages), min(ages, default=None), max(ages, default=None)
+
+
+def merge_age_summaries(summaries):
+    """Combine age_summary results into overall statistics (min/max are None when empty)"""
+    summaries = [summary for summary in summaries if summary[0]]
+    count = sum(summary[0] for summary in summaries)
+    total = sum(summary[1] for summary in summaries)
+    return {
+        'count': count,
+        'average': total / count if count else 0.0,
+        'min': min((summary[2] for summary in summaries), default=None),
+        'max': max((summary[3] for summary in summaries), default=None),
+    }
+
+
+def score_users(rows):
+    """Example CPU-bound scoring of (id, name, age) rows"""
+    return [(row[0], sum(ord(char) for char in row[1]) * row[2] % 997) for row in rows]
+
+
+async def demo():
+    print("=== Process Pool Fan-Out ===\n")
+    await concurrent.setup_database()
+    start = time.perf_counter()
+    stats = await process_query("SELECT id, name, age FROM users", age_summary,
+                                combine=merge_age_summaries, numeric_columns=("age",), chunk_size=4)
+    print(f"Age statistics from shared-memory chunks: {stats}")
+    scores = await process_query("SELECT id, name, age FROM users", score_users, chunk_size=4)
+    print(f"Scored {sum(len(chunk) for chunk in scores)} users in {len(scores)} chunks "
+          f"({time.perf_counter() - start:.3f}s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(demo())
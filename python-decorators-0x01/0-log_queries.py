@@ -1,5 +1,6 @@
 import sqlite3
 import functools
+import inspect
 import logging
 from datetime import datetime
 
@@ -8,38 +9,65 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 
+def _extract_query(args, kwargs):
+    """Find the SQL statement among the call arguments, if any."""
+    query = None
+    if args:
+        for arg in args:
+            if isinstance(arg, str) and (
+                    'SELECT' in arg.upper() or 'INSERT' in arg.upper() or 'UPDATE' in arg.upper() or 'DELETE' in arg.upper()):
+                query = arg
+                break
+
+    if 'query' in kwargs:
+        query = kwargs['query']
+    return query
+
+
+def _log_start(func, args, kwargs):
+    """Log the query (or function) about to run and return the log timestamp."""
+    query = _extract_query(args, kwargs)
+
+    # Log with timestamp
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if query:
+        logger.info(f"[{timestamp}] Executing SQL Query: {query}")
+    else:
+        logger.info(f"[{timestamp}] Executing function: {func.__name__}")
+    return timestamp
+
+
+def _log_done(timestamp, start_time, result):
+    execution_time = (datetime.now() - start_time).total_seconds()
+    logger.info(
+        f"[{timestamp}] Query executed successfully in {execution_time:.3f}s. Returned {len(result) if isinstance(result, (list, tuple)) else 1} row(s)")
+
+
 def log_queries(func):
-    """Decorator to log SQL queries executed by any function."""
+    """Decorator to log SQL queries executed by any function.
+
+    Coroutine functions get an async wrapper so the await itself is timed.
+    """
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            timestamp = _log_start(func, args, kwargs)
+            start_time = datetime.now()
+            result = await func(*args, **kwargs)
+            _log_done(timestamp, start_time, result)
+            return result
+
+        return async_wrapper
 
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        # Extract query from arguments
-        query = None
-        if args:
-            for arg in args:
-                if isinstance(arg, str) and (
-                        'SELECT' in arg.upper() or 'INSERT' in arg.upper() or 'UPDATE' in arg.upper() or 'DELETE' in arg.upper()):
-                    query = arg
-                    break
-
-        if 'query' in kwargs:
-            query = kwargs['query']
-
-        # Log with timestamp
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        if query:
-            logger.info(f"[{timestamp}] Executing SQL Query: {query}")
-        else:
-            logger.info(f"[{timestamp}] Executing function: {func.__name__}")
+        timestamp = _log_start(func, args, kwargs)
 
         # Execute the original function
         start_time = datetime.now()
         result = func(*args, **kwargs)
-        end_time = datetime.now()
-        execution_time = (end_time - start_time).total_seconds()
-
-        logger.info(
-            f"[{timestamp}] Query executed successfully in {execution_time:.3f}s. Returned {len(result) if isinstance(result, (list, tuple)) else 1} row(s)")
+        _log_done(timestamp, start_time, result)
 
         return result
 
@@ -1,23 +1,451 @@
 import sqlite3
+import asyncio
+import contextvars
 import functools
+import inspect
+import threading
+import time
+import weakref
+from collections import OrderedDict
 
-def with_db_connection(func):
-    """Decorator that automatically handles opening and closing database connections."""
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        # Open database connection
-        conn = sqlite3.connect('users.db')
+try:
+    import aiosqlite
+except ImportError:  # async support is optional
+    aiosqlite = None
+
+# SQLite settings applied once to every pooled connection.
+# WAL lets readers run alongside a writer instead of queueing behind it.
+DEFAULT_PROFILE = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 268435456,  # 256 MiB
+    'cache_size': -65536,  # negative means KiB, i.e. 64 MiB
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,  # milliseconds
+}
+
+# Stored in the database file, so they only need setting once per database
+PERSISTENT_PRAGMAS = frozenset({'journal_mode'})
+
+# (db_name, pragma, value) already applied by an async connection
+_persistent_applied = set()
+_persistent_lock = threading.Lock()
+
+def apply_profile(conn, profile):
+    """Apply the PRAGMA settings of a connection profile to a connection."""
+    for pragma, value in (profile or {}).items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+
+async def apply_profile_async(conn, db_name, profile):
+    """Apply a profile to an aiosqlite connection.
+
+    Per-connection pragmas are set every time; persistent ones (journal_mode)
+    only on the first connection to ``db_name`` in this process.
+    """
+    for pragma, value in (profile or {}).items():
+        if pragma in PERSISTENT_PRAGMAS:
+            key = (db_name, pragma, str(value))
+            with _persistent_lock:
+                if key in _persistent_applied:
+                    continue
+            await conn.execute(f"PRAGMA {pragma} = {value}")
+            with _persistent_lock:
+                _persistent_applied.add(key)
+        else:
+            await conn.execute(f"PRAGMA {pragma} = {value}")
+
+class StatementCache:
+    """Mirror of sqlite3's per-connection LRU statement cache, for observability.
+
+    sqlite3 itself reuses up to ``cached_statements`` prepared statements keyed
+    by SQL text; the pool keeps connections alive so that cache stays warm, and
+    this records the same LRU so hits, misses and evictions can be read.
+    PRAGMAs take slots like any statement but are left out of the counters.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._statements = OrderedDict()
+
+    def record(self, sql):
+        counted = not sql.lstrip().upper().startswith('PRAGMA')
+        if sql in self._statements:
+            self._statements.move_to_end(sql)
+            self.hits += counted
+            return
+        self.misses += counted
+        self._statements[sql] = True
+        if len(self._statements) > self.capacity:
+            self._statements.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        return {
+            'capacity': self.capacity,
+            'size': len(self._statements),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+class TrackedCursor(sqlite3.Cursor):
+    """Cursor that reports executed SQL to its connection's StatementCache."""
+
+    def execute(self, sql, parameters=()):
+        self.connection.statement_cache.record(sql)
+        return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        self.connection.statement_cache.record(sql)
+        return super().executemany(sql, seq_of_parameters)
+
+class TrackedConnection(sqlite3.Connection):
+    """Connection whose statement cache usage is observable."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statement_cache = StatementCache(kwargs.get('cached_statements', 128))
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or TrackedCursor)
+
+    def execute(self, sql, parameters=()):
+        self.statement_cache.record(sql)
+        return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        self.statement_cache.record(sql)
+        return super().executemany(sql, seq_of_parameters)
+
+class ConnectionPool:
+    """Thread-safe pool of SQLite connections to one database file.
+
+    The profile is applied when a connection is created, not on every borrow,
+    and since connections live on, their prepared-statement caches stay warm.
+    """
+
+    def __init__(self, db_name='users.db', profile=None, max_idle=8, cached_statements=128):
+        self.db_name = db_name
+        self.profile = profile
+        self.max_idle = max_idle
+        self.cached_statements = cached_statements
+        self._idle = []
+        self._connections = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_name, check_same_thread=False,
+                               cached_statements=self.cached_statements,
+                               factory=TrackedConnection)
+        apply_profile(conn, self.profile)
+        with self._lock:
+            self._connections.add(conn)
+        return conn
+
+    def statement_cache_stats(self):
+        """Statement cache counters summed over the pool's live connections."""
+        totals = {'connections': 0, 'capacity': self.cached_statements,
+                  'size': 0, 'hits': 0, 'misses': 0, 'evictions': 0}
+        with self._lock:
+            connections = list(self._connections)
+        for conn in connections:
+            stats = conn.statement_cache.stats()
+            totals['connections'] += 1
+            for key in ('size', 'hits', 'misses', 'evictions'):
+                totals[key] += stats[key]
+        return totals
+
+    def acquire(self):
+        """Borrow a connection, opening a new one if none is idle."""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def release(self, conn):
+        """Return a connection, discarding any transaction the caller left open."""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_name='users.db', profile=DEFAULT_PROFILE):
+    """Return the shared pool for a database file and profile."""
+    key = (db_name, tuple(sorted((profile or {}).items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(db_name, profile)
+        return pool
+
+def read_only(func):
+    """Mark a function as read-only so a ReplicaRouter may send it to a replica."""
+    func.read_only = True
+    return func
+
+_WRITE_KEYWORDS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'CREATE', 'DROP', 'ALTER')
+
+def is_read_only_sql(sql):
+    """Return True if a statement only reads (SELECT, or a CTE that writes nothing)."""
+    statement = sql.lstrip().upper()
+    if statement.startswith('SELECT'):
+        return True
+    return statement.startswith('WITH') and not any(word in statement for word in _WRITE_KEYWORDS)
+
+def _call_is_read_only(func, args, kwargs):
+    """Decide whether a call only reads, from its marker or the SQL it was given."""
+    if getattr(func, 'read_only', False) or hasattr(func, 'batch_lookup'):
+        return True
+    statements = [arg for arg in list(args) + list(kwargs.values())
+                  if isinstance(arg, str) and arg.lstrip().upper().startswith(('SELECT', 'WITH', 'INSERT',
+                                                                                'UPDATE', 'DELETE', 'REPLACE'))]
+    return bool(statements) and all(is_read_only_sql(sql) for sql in statements)
+
+class ReplicaRouter:
+    """Route read-only calls to replica databases and everything else to the primary.
+
+    Replicas are picked round-robin or by fewest in-flight calls. After a
+    write - a transactional commit (see record_write) or any successful call
+    routed to the primary that is not read-only - reads from the same thread
+    or task stay on the primary for ``sticky_seconds`` so callers always see
+    their own writes despite replication lag. Keeping the replica files up to date is outside this class.
+    """
+
+    def __init__(self, primary='users.db', replicas=(), policy='round_robin', sticky_seconds=2.0):
+        if policy not in ('round_robin', 'least_loaded'):
+            raise ValueError(f"Unknown replica policy: {policy}")
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.policy = policy
+        self.sticky_seconds = sticky_seconds
+        self._in_flight = {replica: 0 for replica in self.replicas}
+        self._served = {target: 0 for target in [primary] + self.replicas}
+        self._next = 0
+        self._lock = threading.Lock()
+        self._last_write = contextvars.ContextVar(f'last_write_{id(self)}', default=None)
+
+    def record_write(self):
+        """Pin this thread/task's reads to the primary for sticky_seconds."""
+        self._last_write.set(time.monotonic())
+
+    def _sticky(self):
+        last_write = self._last_write.get()
+        return last_write is not None and time.monotonic() - last_write < self.sticky_seconds
+
+    def choose(self, reads):
+        """Return the database to use for a call and reserve it."""
+        with self._lock:
+            if not reads or not self.replicas or self._sticky():
+                target = self.primary
+            elif self.policy == 'least_loaded':
+                target = min(self.replicas, key=self._in_flight.__getitem__)
+            else:
+                target = self.replicas[self._next % len(self.replicas)]
+                self._next += 1
+            if target != self.primary:
+                self._in_flight[target] += 1
+            self._served[target] += 1
+            return target
+
+    def done(self, target, reads, succeeded):
+        """Release a target chosen by choose() and note successful writes."""
+        if target != self.primary:
+            with self._lock:
+                self._in_flight[target] -= 1
+        elif not reads and succeeded:
+            self.record_write()
+
+    def stats(self):
+        with self._lock:
+            return {'served': dict(self._served), 'in_flight': dict(self._in_flight)}
+
+_default_router = None
+
+def set_router(router):
+    """Install a ReplicaRouter used by with_db_connection for its primary database."""
+    global _default_router
+    _default_router = router
+
+def record_write():
+    """Tell the installed router that this thread/task just committed a write.
+
+    transactional (2-transactional.py) calls this after each commit, so reads
+    that follow stay on the primary for the router's sticky_seconds.
+    """
+    if _default_router is not None:
+        _default_router.record_write()
+
+# SQLite's historical limit on bound parameters per statement
+MAX_BATCH_PARAMETERS = 999
+
+# Lookup chunks are padded up to one of these sizes, so batch_call only ever
+# prepares a handful of distinct IN (...) statements
+BATCH_SIZES = (1, 4, 16, 64, 256, MAX_BATCH_PARAMETERS)
+
+def _padded(chunk):
+    """Pad ``chunk`` to the next BATCH_SIZES size by repeating its last key."""
+    size = next(size for size in BATCH_SIZES if size >= len(chunk))
+    return chunk + [chunk[-1]] * (size - len(chunk))
+
+def batch_lookup(query, key_column=0):
+    """Mark a single-key lookup so batch_call can answer many keys with one query.
+
+    ``query`` holds an ``IN ({placeholders})`` clause over the key, and
+    ``key_column`` is the position of the key in each returned row.
+    """
+    def decorator(func):
+        func.batch_lookup = (query, key_column)
+        return func
+    return decorator
+
+def batch_write(statement):
+    """Mark a write so batch_call runs it as a single executemany.
+
+    ``statement`` uses named parameters matching the function's arguments,
+    e.g. ``UPDATE users SET age = :age WHERE id = :user_id``.
+    """
+    def decorator(func):
+        func.batch_write = statement
+        return func
+    return decorator
+
+def _run_batch(func, conn, arg_tuples):
+    """Run many calls of ``func`` on one connection, collapsing them when marked."""
+    lookup = getattr(func, 'batch_lookup', None)
+    if lookup is not None:
+        query, key_column = lookup
+        keys = [args[0] for args in arg_tuples]
+        unique_keys = list(dict.fromkeys(keys))
+        rows = {}
+        cursor = conn.cursor()
+        for i in range(0, len(unique_keys), MAX_BATCH_PARAMETERS):
+            # Duplicate keys don't change an IN (...) result; padding keeps the
+            # SQL text, and so the cached prepared statement, the same
+            chunk = _padded(unique_keys[i:i + MAX_BATCH_PARAMETERS])
+            cursor.execute(query.format(placeholders=', '.join('?' * len(chunk))), chunk)
+            for row in cursor.fetchall():
+                rows[row[key_column]] = row
+        return [rows.get(key) for key in keys]
+
+    statement = getattr(func, 'batch_write', None)
+    if statement is not None:
+        signature = inspect.signature(func)
+        params = []
+        for args in arg_tuples:
+            bound = signature.bind(conn, *args)
+            bound.apply_defaults()
+            params.append(dict(list(bound.arguments.items())[1:]))
+        cursor = conn.cursor()
+        cursor.executemany(statement, params)
+        conn.commit()
+        return cursor.rowcount
+
+    return [func(conn, *args) for args in arg_tuples]
+
+def with_db_connection(func=None, *, db_name='users.db', profile=DEFAULT_PROFILE, router=None):
+    """Decorator that automatically handles opening and closing database connections.
+
+    Connections are borrowed from a shared pool configured with ``profile``
+    (pass ``profile=None`` for SQLite defaults). Usable bare or with arguments:
+    ``@with_db_connection(db_name='other.db')``. When a ReplicaRouter for
+    ``db_name`` is given (or installed with set_router), read-only calls are
+    sent to its replicas.
+    Coroutine functions receive an aiosqlite connection instead.
+    """
+    if func is None:
+        return functools.partial(with_db_connection, db_name=db_name, profile=profile, router=router)
+
+    if inspect.iscoroutinefunction(func):
+        if aiosqlite is None:
+            raise ImportError(f"aiosqlite is required to decorate async function {func.__name__}")
+
+        # Not pooled: aiosqlite runs each connection on a non-daemon thread,
+        # so idle pooled connections would keep the interpreter from exiting
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            active_router = router or _default_router
+            if active_router is None or active_router.primary != db_name:
+                async with aiosqlite.connect(db_name) as conn:
+                    await apply_profile_async(conn, db_name, profile)
+                    return await func(conn, *args, **kwargs)
+
+            reads = _call_is_read_only(func, args, kwargs)
+            target = active_router.choose(reads)
+            succeeded = False
+            try:
+                async with aiosqlite.connect(target) as conn:
+                    await apply_profile_async(conn, target, profile)
+                    result = await func(conn, *args, **kwargs)
+                succeeded = True
+                return result
+            finally:
+                active_router.done(target, reads, succeeded)
+        return async_wrapper
+
+    pool = get_pool(db_name, profile)
+
+    def checkout(reads):
+        active_router = router or _default_router
+        if active_router is None or active_router.primary != db_name:
+            return pool, None
+        target = active_router.choose(reads)
+        return (pool if target == db_name else get_pool(target, profile)), active_router
+
+    def run_routed(reads, call):
+        target_pool, active_router = checkout(reads)
+        # Borrow a database connection
+        conn = target_pool.acquire()
+        succeeded = False
         try:
-            # Call the original function with connection as first argument
-            result = func(conn, *args, **kwargs)
+            result = call(conn)
+            succeeded = True
             return result
         finally:
-            # Always close the connection
-            conn.close()
-    
+            # Always hand the connection back
+            target_pool.release(conn)
+            if active_router is not None:
+                active_router.done(target_pool.db_name, reads, succeeded)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # Call the original function with connection as first argument
+        return run_routed(_call_is_read_only(func, args, kwargs),
+                          lambda conn: func(conn, *args, **kwargs))
+
+    def batch_call(arg_tuples):
+        """Call the function once per argument tuple using a single connection.
+
+        Functions marked with batch_lookup become one ``IN (...)`` query (one
+        row or None per key); functions marked with batch_write become one
+        executemany and return the total rowcount; others run back to back on
+        the same (warm) connection and return a list of results.
+        """
+        arg_tuples = list(arg_tuples)
+        reads = _call_is_read_only(func, (), {})
+        return run_routed(reads, lambda conn: _run_batch(func, conn, arg_tuples))
+
+    wrapper.batch_call = batch_call
+    wrapper.pool = pool
     return wrapper
 
 @with_db_connection
+@batch_lookup("SELECT * FROM users WHERE id IN ({placeholders})")
 def get_user_by_id(conn, user_id):
     """Get a user by their ID."""
     cursor = conn.cursor()
@@ -25,12 +453,27 @@ def get_user_by_id(conn, user_id):
     return cursor.fetchone()
 
 @with_db_connection
+@read_only
 def get_users_by_age_range(conn, min_age, max_age):
     """Get users within a specific age range."""
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM users WHERE age BETWEEN ? AND ?", (min_age, max_age))
     return cursor.fetchall()
 
+@with_db_connection
+@read_only
+async def async_get_user_by_id(conn, user_id):
+    """Get a user by their ID without blocking the event loop."""
+    async with conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)) as cursor:
+        return await cursor.fetchone()
+
+@with_db_connection
+@batch_write("UPDATE users SET age = :age WHERE id = :user_id")
+def set_user_age(conn, user_id, age):
+    """Set a user's age."""
+    conn.execute("UPDATE users SET age = ? WHERE id = ?", (age, user_id))
+    conn.commit()
+
 if __name__ == "__main__":
     print("=== Task 1: Handle Database Connections with a Decorator ===")
     
@@ -46,3 +489,18 @@ if __name__ == "__main__":
     print(f"\nUsers aged 30-40 ({len(users_in_range)} found):")
     for user in users_in_range:
         print(f"  {user[1]} (Age: {user[3]})")
+    
+    # Many lookups in one round-trip
+    batch = get_user_by_id.batch_call([(1,), (2,), (3,)])
+    print(f"\nBatched lookup of 3 IDs: {[user[1] if user else None for user in batch]}")
+    
+    # Repeated calls reuse the pooled connection's prepared statements
+    for user_id in (2, 3):
+        get_user_by_id(user_id=user_id)
+    get_user_by_id.batch_call([(4,), (5,)])
+    print(f"Statement cache: {get_user_by_id.pool.statement_cache_stats()}")
+    
+    # The same decorator works on coroutine functions
+    if aiosqlite is not None:
+        user = asyncio.run(async_get_user_by_id(user_id=1))
+        print(f"\nAsync lookup: {user}")
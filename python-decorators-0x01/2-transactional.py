@@ -1,13 +1,37 @@
 import sqlite3
 import functools
+import inspect
 import logging
+import threading
+import time
+
+try:
+    import aiosqlite
+except ImportError:  # async support is optional
+    aiosqlite = None
+
+# Lets commits pin the caller's reads to the primary when a ReplicaRouter is set
+replica_routing = __import__('1-with_db_connection')
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 def with_db_connection(func):
-    """Decorator that automatically handles opening and closing database connections."""
+    """Decorator that automatically handles opening and closing database connections.
+
+    Coroutine functions receive an aiosqlite connection instead.
+    """
+    if inspect.iscoroutinefunction(func):
+        if aiosqlite is None:
+            raise ImportError(f"aiosqlite is required to decorate async function {func.__name__}")
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            async with aiosqlite.connect('users.db') as conn:
+                return await func(conn, *args, **kwargs)
+        return async_wrapper
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         conn = sqlite3.connect('users.db')
@@ -20,6 +44,23 @@ def with_db_connection(func):
 
 def transactional(func):
     """Decorator that manages database transactions by automatically committing or rolling back changes."""
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(conn, *args, **kwargs):
+            try:
+                await conn.execute('BEGIN')
+                logger.info(f"Transaction started for {func.__name__}")
+                result = await func(conn, *args, **kwargs)
+                await conn.commit()
+                replica_routing.record_write()
+                logger.info(f"Transaction committed successfully for {func.__name__}")
+                return result
+            except Exception as e:
+                await conn.rollback()
+                logger.error(f"Transaction rolled back for {func.__name__}: {str(e)}")
+                raise e
+        return async_wrapper
+
     @functools.wraps(func)
     def wrapper(conn, *args, **kwargs):
         try:
@@ -32,6 +73,7 @@ def transactional(func):
             
             # Commit the transaction
             conn.commit()
+            replica_routing.record_write()
             logger.info(f"Transaction committed successfully for {func.__name__}")
             
             return result
@@ -44,6 +86,151 @@ def transactional(func):
     
     return wrapper
 
+class _Batch:
+    """A group of calls sharing one transaction."""
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.operations = 0
+        self.error = None
+        self.done = threading.Event()
+
+class GroupCommit:
+    """Group commit: many write calls, from any thread, share one transaction.
+
+    The shared transaction is committed every ``max_delay_ms`` milliseconds or
+    after ``max_batch`` successful calls, whichever comes first, so N small
+    writes cost one fsync instead of N. Each call runs inside its own SAVEPOINT,
+    so a failing call only rolls back its own changes. Callers block until the
+    batch holding their work is committed; a normal return means it is durable.
+    Decorated functions must not call each other (the writer is not reentrant).
+    """
+
+    def __init__(self, db_name='users.db', max_delay_ms=5, max_batch=100):
+        self.db_name = db_name
+        self.max_delay = max_delay_ms / 1000.0
+        self.max_batch = max_batch
+        # Autocommit mode so BEGIN/SAVEPOINT/COMMIT are fully under our control
+        self.conn = sqlite3.connect(db_name, check_same_thread=False, isolation_level=None)
+        self._cond = threading.Condition(threading.Lock())
+        self._batch = None
+        self._savepoint_id = 0
+        self._closed = False
+        self._flusher = threading.Thread(target=self._flush_loop, name='group-commit', daemon=True)
+        self._flusher.start()
+
+    def run(self, func, *args, **kwargs):
+        """Run ``func(conn, *args, **kwargs)`` in the current batch and wait for its commit."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("GroupCommit writer is closed")
+            if self._batch is None:
+                if self.conn.in_transaction:
+                    # Left over from a commit whose rollback failed; retry it
+                    self.conn.execute('ROLLBACK')
+                self.conn.execute('BEGIN')
+                self._batch = _Batch(time.monotonic() + self.max_delay)
+                self._cond.notify_all()
+            batch = self._batch
+            self._savepoint_id += 1
+            savepoint = f"sp_{self._savepoint_id}"
+            self.conn.execute(f"SAVEPOINT {savepoint}")
+            try:
+                result = func(self.conn, *args, **kwargs)
+            except Exception as e:
+                self.conn.execute(f"ROLLBACK TO {savepoint}")
+                self.conn.execute(f"RELEASE {savepoint}")
+                logger.error(f"Savepoint rolled back for {func.__name__}: {str(e)}")
+                raise
+            self.conn.execute(f"RELEASE {savepoint}")
+            batch.operations += 1
+            if batch.operations >= self.max_batch:
+                self._commit_locked()
+
+        batch.done.wait()
+        if batch.error is not None:
+            raise batch.error
+        replica_routing.record_write()
+        return result
+
+    def _commit_locked(self):
+        batch, self._batch = self._batch, None
+        try:
+            self.conn.execute('COMMIT')
+            logger.debug(f"Group commit of {batch.operations} operation(s)")
+        except Exception as e:
+            batch.error = e
+            logger.error(f"Group commit failed, {batch.operations} operation(s) rolled back: {str(e)}")
+            # A failed COMMIT may already have ended the transaction, and a failing
+            # ROLLBACK must not escape: the flusher thread calls this too
+            if self.conn.in_transaction:
+                try:
+                    self.conn.execute('ROLLBACK')
+                except Exception as rollback_error:
+                    logger.error(f"Rollback after failed group commit failed: {str(rollback_error)}")
+        finally:
+            batch.done.set()
+
+    def _flush_loop(self):
+        with self._cond:
+            while not self._closed:
+                if self._batch is None:
+                    self._cond.wait()
+                    continue
+                remaining = self._batch.deadline - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                try:
+                    self._commit_locked()
+                except Exception as e:
+                    # Keep flushing later batches; their callers are waiting
+                    logger.error(f"Group commit flusher error: {str(e)}")
+
+    def flush(self):
+        """Commit the current batch immediately."""
+        with self._cond:
+            if self._batch is not None:
+                self._commit_locked()
+
+    def close(self):
+        """Flush pending work, stop the flusher and close the connection."""
+        with self._cond:
+            if self._closed:
+                return
+            if self._batch is not None:
+                self._commit_locked()
+            self._closed = True
+            self._cond.notify_all()
+        self._flusher.join()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+def group_transactional(writer):
+    """Decorator that runs a write function through a shared GroupCommit writer.
+
+    Use it instead of ``@with_db_connection @transactional`` for high-rate small writes.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return writer.run(func, *args, **kwargs)
+        return wrapper
+    return decorator
+
+def set_user_age(conn, user_id, age):
+    """Set a user's age (undecorated so it can be used with either commit strategy)."""
+    cursor = conn.cursor()
+    cursor.execute("UPDATE users SET age = ? WHERE id = ?", (age, user_id))
+    if cursor.rowcount == 0:
+        raise ValueError(f"No user found with ID {user_id}")
+
 @with_db_connection
 @transactional
 def update_user_email(conn, user_id, new_email):
@@ -98,3 +285,28 @@ if __name__ == "__main__":
             
     except Exception as e:
         print(f"Unexpected error: {e}")
+    
+    # Compare per-call transactions with group commit across threads
+    print("\nComparing per-call transactions with group commit (20 threads x 20 writes)...")
+    per_call_set_age = with_db_connection(transactional(set_user_age))
+    logger.setLevel(logging.WARNING)
+    
+    def write_many(set_age):
+        for _ in range(20):
+            set_age(1, 30)
+    
+    for label, set_age, writer in [
+        ("per-call", per_call_set_age, None),
+        ("group commit", None, GroupCommit(max_delay_ms=2, max_batch=20)),
+    ]:
+        if writer is not None:
+            set_age = group_transactional(writer)(set_user_age)
+        start = time.perf_counter()
+        threads = [threading.Thread(target=write_many, args=(set_age,)) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if writer is not None:
+            writer.close()
+        print(f"  {label}: {time.perf_counter() - start:.3f}s")
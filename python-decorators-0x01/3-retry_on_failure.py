@@ -1,15 +1,37 @@
 import time
+import asyncio
 import sqlite3
 import functools
+import inspect
 import logging
 import random
+import threading
+from collections import deque
+
+try:
+    import aiosqlite
+except ImportError:  # async support is optional
+    aiosqlite = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 def with_db_connection(func):
-    """Decorator that automatically handles opening and closing database connections."""
+    """Decorator that automatically handles opening and closing database connections.
+
+    Coroutine functions receive an aiosqlite connection instead.
+    """
+    if inspect.iscoroutinefunction(func):
+        if aiosqlite is None:
+            raise ImportError(f"aiosqlite is required to decorate async function {func.__name__}")
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            async with aiosqlite.connect('users.db') as conn:
+                return await func(conn, *args, **kwargs)
+        return async_wrapper
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         conn = sqlite3.connect('users.db')
@@ -20,11 +42,242 @@ def with_db_connection(func):
             conn.close()
     return wrapper
 
-def retry_on_failure(retries=3, delay=2):
-    """Decorator that retries database operations if they fail due to transient errors."""
+class RetryBudget:
+    """Process-wide cap on retries expressed as a fraction of recent traffic.
+
+    Every first attempt counts as a request; a retry is only granted while the
+    number of retries in the sliding window stays below
+    ``ratio * requests + min_retries_per_sec * window``.
+    """
+
+    def __init__(self, ratio=0.1, min_retries_per_sec=1, window=10.0):
+        self.ratio = ratio
+        self.min_retries_per_sec = min_retries_per_sec
+        self.window = window
+        self._requests = deque()
+        self._retries = deque()
+        self._lock = threading.Lock()
+
+    def _prune(self, now):
+        cutoff = now - self.window
+        while self._requests and self._requests[0] < cutoff:
+            self._requests.popleft()
+        while self._retries and self._retries[0] < cutoff:
+            self._retries.popleft()
+
+    def record_request(self):
+        """Record a first attempt."""
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            self._requests.append(now)
+
+    def can_retry(self):
+        """Reserve a retry if the budget allows it."""
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            allowed = self.ratio * len(self._requests) + self.min_retries_per_sec * self.window
+            if len(self._retries) >= allowed:
+                return False
+            self._retries.append(now)
+            return True
+
+    def stats(self):
+        """Return request/retry counts for the current window."""
+        with self._lock:
+            self._prune(time.monotonic())
+            return {'requests': len(self._requests), 'retries': len(self._retries)}
+
+
+# Shared by every retry_on_failure decorator unless one is passed explicitly
+default_retry_budget = RetryBudget()
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Closed/open/half-open circuit breaker driven by a failure-rate window."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, name='database', failure_rate_threshold=0.5, window_size=20,
+                 minimum_calls=5, reset_timeout=30.0, half_open_max_calls=1):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._outcomes = deque(maxlen=window_size)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._half_open_successes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            return self._state
+
+    def _maybe_half_open(self, now):
+        if self._state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+            self._half_open_successes = 0
+            logger.info(f"Circuit '{self.name}' half-open, allowing trial calls")
+
+    def _open(self, now):
+        self._state = self.OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+        logger.warning(f"Circuit '{self.name}' opened for {self.reset_timeout}s")
+
+    def allow_request(self):
+        """Return True if a call may proceed, reserving a trial slot when half-open."""
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+            return False
+
+    def release_trial(self):
+        """Give back a half-open trial slot whose call ended without an outcome."""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def record_success(self):
+        with self._lock:
+            if self._state == self.OPEN:
+                # Admitted before the circuit opened; too late to count
+                return
+            if self._state == self.HALF_OPEN:
+                self._half_open_successes += 1
+                if self._half_open_successes >= self.half_open_max_calls:
+                    self._state = self.CLOSED
+                    self._outcomes.clear()
+                    logger.info(f"Circuit '{self.name}' closed after successful trial calls")
+            else:
+                self._outcomes.append(True)
+
+    def record_failure(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._state == self.OPEN:
+                # Don't push the reset timeout back for calls admitted earlier
+                return
+            if self._state == self.HALF_OPEN:
+                self._open(now)
+                return
+            self._outcomes.append(False)
+            calls = len(self._outcomes)
+            if calls >= self.minimum_calls:
+                failure_rate = self._outcomes.count(False) / calls
+                if failure_rate >= self.failure_rate_threshold:
+                    self._open(now)
+
+
+def circuit_breaker(breaker):
+    """Decorator that rejects calls with CircuitOpenError while the breaker is open.
+
+    Place it outside with_db_connection so no connection is opened for rejected calls.
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not breaker.allow_request():
+                    raise CircuitOpenError(f"Circuit '{breaker.name}' is open; {func.__name__} rejected")
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception:
+                    breaker.record_failure()
+                    raise
+                except BaseException:
+                    # Cancelled or interrupted: no verdict, but free the trial slot
+                    breaker.release_trial()
+                    raise
+                breaker.record_success()
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not breaker.allow_request():
+                raise CircuitOpenError(f"Circuit '{breaker.name}' is open; {func.__name__} rejected")
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                breaker.record_failure()
+                raise
+            except BaseException:
+                # Interrupted: no verdict, but free the trial slot
+                breaker.release_trial()
+                raise
+            breaker.record_success()
+            return result
+
+        return wrapper
+    return decorator
+
+
+def retry_on_failure(retries=3, delay=2, budget=None):
+    """Decorator that retries database operations if they fail due to transient errors.
+
+    Retries are drawn from ``budget`` (the process-wide default_retry_budget unless
+    given), so during an outage callers give up early instead of multiplying load.
+    """
     def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                retry_budget = budget if budget is not None else default_retry_budget
+                retry_budget.record_request()
+                last_exception = None
+
+                for attempt in range(retries + 1):
+                    try:
+                        if attempt > 0:
+                            logger.info(f"Retry attempt {attempt}/{retries} for {func.__name__}")
+                            await asyncio.sleep(delay)
+
+                        result = await func(*args, **kwargs)
+
+                        if attempt > 0:
+                            logger.info(f"Function {func.__name__} succeeded on attempt {attempt + 1}")
+
+                        return result
+
+                    except CircuitOpenError:
+                        raise
+                    except Exception as e:
+                        last_exception = e
+                        logger.warning(f"Attempt {attempt + 1} failed for {func.__name__}: {str(e)}")
+
+                        if attempt == retries:
+                            break
+                        if not retry_budget.can_retry():
+                            logger.warning(f"Retry budget exhausted, not retrying {func.__name__}")
+                            break
+
+                logger.error(f"All {attempt + 1} attempts failed for {func.__name__}")
+                raise last_exception
+
+            return async_wrapper
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
+            retry_budget = budget if budget is not None else default_retry_budget
+            retry_budget.record_request()
             last_exception = None
             
             for attempt in range(retries + 1):  # +1 because we want to include the initial attempt
@@ -40,6 +293,9 @@ def retry_on_failure(retries=3, delay=2):
                     
                     return result
                     
+                except CircuitOpenError:
+                    # An open circuit is not transient; retrying would only add load
+                    raise
                 except Exception as e:
                     last_exception = e
                     logger.warning(f"Attempt {attempt + 1} failed for {func.__name__}: {str(e)}")
@@ -47,9 +303,12 @@ def retry_on_failure(retries=3, delay=2):
                     # Don't retry on the last attempt
                     if attempt == retries:
                         break
+                    if not retry_budget.can_retry():
+                        logger.warning(f"Retry budget exhausted, not retrying {func.__name__}")
+                        break
             
             # If we get here, all attempts failed
-            logger.error(f"All {retries + 1} attempts failed for {func.__name__}")
+            logger.error(f"All {attempt + 1} attempts failed for {func.__name__}")
             raise last_exception
         
         return wrapper
@@ -82,6 +341,15 @@ def always_failing_operation(conn):
     """Simulate an operation that always fails to test retry exhaustion."""
     raise sqlite3.DatabaseError("This operation always fails")
 
+db_breaker = CircuitBreaker(name='users.db', minimum_calls=3, reset_timeout=1.0)
+
+@circuit_breaker(db_breaker)
+@with_db_connection
+@retry_on_failure(retries=1, delay=0.1)
+def guarded_failing_operation(conn):
+    """Simulate an outage behind a circuit breaker."""
+    raise sqlite3.OperationalError("database is unavailable")
+
 if __name__ == "__main__":
     print("=== Task 3: Retry Database Queries ===")
     
@@ -107,3 +375,33 @@ if __name__ == "__main__":
         always_failing_operation()
     except Exception as e:
         print(f"Operation failed after all retries: {e}")
+    
+    # Show the circuit breaker failing fast once the failure rate trips it
+    print("\n4. Testing circuit breaker during a simulated outage:")
+    for call in range(5):
+        try:
+            guarded_failing_operation()
+        except CircuitOpenError as e:
+            print(f"Call {call + 1} rejected without touching the database: {e}")
+        except Exception as e:
+            print(f"Call {call + 1} failed: {e} (circuit {db_breaker.state})")
+
+    # A cancelled trial call must not leave the breaker stuck half-open
+    print("\n5. Cancelling a half-open trial call:")
+    trial_breaker = CircuitBreaker(name='trial', minimum_calls=1, reset_timeout=0.05)
+    trial_breaker.record_failure()
+    time.sleep(0.1)
+
+    @circuit_breaker(trial_breaker)
+    async def slow_trial():
+        await asyncio.sleep(10)
+
+    async def cancel_trial():
+        task = asyncio.ensure_future(slow_trial())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(cancel_trial())
+    print(f"Circuit {trial_breaker.state}, next trial allowed: {trial_breaker.allow_request()}")
+    print(f"Retry budget usage: {default_retry_budget.stats()}")
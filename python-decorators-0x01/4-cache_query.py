@@ -1,9 +1,17 @@
 import time
+import asyncio
 import sqlite3
 import functools
+import inspect
 import hashlib
 import json
 import logging
+import threading
+
+try:
+    import aiosqlite
+except ImportError:  # async support is optional
+    aiosqlite = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -12,8 +20,27 @@ logger = logging.getLogger(__name__)
 # Global cache dictionary
 query_cache = {}
 
+# Futures for async queries currently being computed, keyed like query_cache
+_inflight_queries = {}
+
+# Result handed to followers when the leading query was cancelled
+_LEADER_CANCELLED = object()
+
 def with_db_connection(func):
-    """Decorator that automatically handles opening and closing database connections."""
+    """Decorator that automatically handles opening and closing database connections.
+
+    Coroutine functions receive an aiosqlite connection instead.
+    """
+    if inspect.iscoroutinefunction(func):
+        if aiosqlite is None:
+            raise ImportError(f"aiosqlite is required to decorate async function {func.__name__}")
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            async with aiosqlite.connect('users.db') as conn:
+                return await func(conn, *args, **kwargs)
+        return async_wrapper
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         conn = sqlite3.connect('users.db')
@@ -24,21 +51,76 @@ def with_db_connection(func):
             conn.close()
     return wrapper
 
+def _make_cache_key(func, args, kwargs):
+    """Hash function name and arguments (minus the connection) into a cache key."""
+    cache_key_data = {
+        'function': func.__name__,
+        'args': args[1:],  # Skip the connection object
+        'kwargs': kwargs
+    }
+    return hashlib.md5(
+        json.dumps(cache_key_data, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+def _store_result(cache_key, func, result, execution_time):
+    query_cache[cache_key] = {
+        'result': result,
+        'timestamp': time.time(),
+        'execution_time': execution_time,
+        'function': func.__name__
+    }
+    logger.info(f"Result cached for {func.__name__} (execution time: {execution_time:.3f}s)")
+
 def cache_query(func):
-    """Decorator that caches query results based on the SQL query string."""
+    """Decorator that caches query results based on the SQL query string.
+
+    For coroutine functions, concurrent callers with the same key share a single
+    in-flight query (single-flight) instead of all hitting the database.
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            cache_key = _make_cache_key(func, args, kwargs)
+            while True:
+                if cache_key in query_cache:
+                    logger.info(f"Cache HIT for {func.__name__} - returning cached result")
+                    return query_cache[cache_key]['result']
+
+                pending = _inflight_queries.get(cache_key)
+                if pending is None:
+                    break
+                logger.info(f"Cache WAIT for {func.__name__} - joining in-flight query")
+                result = await asyncio.shield(pending)
+                if result is not _LEADER_CANCELLED:
+                    return result
+                # The leader was cancelled; go around and run the query ourselves
+
+            logger.info(f"Cache MISS for {func.__name__} - executing query")
+            future = asyncio.get_running_loop().create_future()
+            _inflight_queries[cache_key] = future
+            try:
+                start_time = time.time()
+                result = await func(*args, **kwargs)
+            except asyncio.CancelledError:
+                # Only the leader is cancelled; followers retry instead
+                future.set_result(_LEADER_CANCELLED)
+                raise
+            except BaseException as e:
+                future.set_exception(e)
+                future.exception()  # Mark retrieved in case nobody else was waiting
+                raise
+            else:
+                _store_result(cache_key, func, result, time.time() - start_time)
+                future.set_result(result)
+                return result
+            finally:
+                _inflight_queries.pop(cache_key, None)
+
+        return async_wrapper
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        # Create a cache key from function name, args, and kwargs
-        cache_key_data = {
-            'function': func.__name__,
-            'args': args[1:],  # Skip the connection object
-            'kwargs': kwargs
-        }
-        
-        # Create a hash of the cache key for consistent lookup
-        cache_key = hashlib.md5(
-            json.dumps(cache_key_data, sort_keys=True, default=str).encode()
-        ).hexdigest()
+        cache_key = _make_cache_key(func, args, kwargs)
         
         # Check if result is in cache
         if cache_key in query_cache:
@@ -49,17 +131,7 @@ def cache_query(func):
         logger.info(f"Cache MISS for {func.__name__} - executing query")
         start_time = time.time()
         result = func(*args, **kwargs)
-        execution_time = time.time() - start_time
-        
-        # Store result in cache with metadata
-        query_cache[cache_key] = {
-            'result': result,
-            'timestamp': time.time(),
-            'execution_time': execution_time,
-            'function': func.__name__
-        }
-        
-        logger.info(f"Result cached for {func.__name__} (execution time: {execution_time:.3f}s)")
+        _store_result(cache_key, func, result, time.time() - start_time)
         return result
     
     return wrapper
@@ -106,14 +178,44 @@ def get_user_count_by_age_range(conn, min_age, max_age):
     cursor.execute("SELECT COUNT(*) FROM users WHERE age BETWEEN ? AND ?", (min_age, max_age))
     return cursor.fetchone()[0]
 
+# The part of the email after '@'. Queries must use this exact expression for
+# SQLite to pick the expression index, which it keeps up to date on every write.
+EMAIL_DOMAIN_EXPR = "lower(substr(email, instr(email, '@') + 1))"
+EMAIL_DOMAIN_INDEX = f"CREATE INDEX IF NOT EXISTS idx_users_email_domain ON users ({EMAIL_DOMAIN_EXPR})"
+EMAIL_DOMAIN_QUERY = f"SELECT * FROM users WHERE {EMAIL_DOMAIN_EXPR} = ?"
+
+# Database files that already have the email-domain index
+_indexed_databases = set()
+_indexed_lock = threading.Lock()
+
+def ensure_email_domain_index(conn):
+    """Create the email-domain index on conn's database if it is missing.
+
+    The DDL runs only on the first call per database file in this process.
+    In-memory databases are never remembered, since each one is separate.
+    """
+    db_file = conn.execute("PRAGMA database_list").fetchone()[2]
+    with _indexed_lock:
+        if db_file and db_file in _indexed_databases:
+            return
+    conn.execute(EMAIL_DOMAIN_INDEX)
+    conn.commit()
+    if db_file:
+        with _indexed_lock:
+            _indexed_databases.add(db_file)
+
 @with_db_connection
 @cache_query
 def get_users_by_email_domain(conn, domain):
-    """Get users by email domain with caching."""
+    """Get users whose email domain is exactly ``domain`` (case-insensitive), with caching.
+
+    Uses the email-domain index instead of scanning with ``LIKE '%domain%'``.
+    """
     time.sleep(0.08)  # Simulate processing time
     
+    ensure_email_domain_index(conn)
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users WHERE email LIKE ?", (f'%{domain}%',))
+    cursor.execute(EMAIL_DOMAIN_QUERY, (domain.lower(),))
     return cursor.fetchall()
 
 if __name__ == "__main__":
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Benchmark email-domain lookups: LIKE scan vs. the email-domain index.
+
+Builds a throwaway users table (1,000,000 rows by default) and times the old
+``email LIKE '%domain%'`` scan against EMAIL_DOMAIN_QUERY from 4-cache_query.
+Usage: python benchmark_email_domain.py [rows] [repeats]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+cache_module = __import__('4-cache_query')
+
+LIKE_QUERY = "SELECT * FROM users WHERE email LIKE ?"
+DOMAINS = ['example.com', 'email.com', 'mail.org', 'corp.net', 'school.edu']
+
+
+def create_database(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT, age INTEGER)")
+    conn.executemany(
+        "INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
+        ((f"user{i}", f"user{i}@{i % 997}.{DOMAINS[i % len(DOMAINS)]}", 18 + i % 60) for i in range(rows))
+    )
+    conn.commit()
+    return conn
+
+
+def time_query(conn, query, param, repeats):
+    """Return the best-of-``repeats`` latency in milliseconds and the row count."""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        rows = conn.execute(query, (param,)).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, len(rows)
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    domain = f"42.{DOMAINS[42 % len(DOMAINS)]}"
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Creating {rows} users...")
+        conn = create_database(os.path.join(tmp, 'bench.db'), rows)
+
+        scan_ms, scan_rows = time_query(conn, LIKE_QUERY, f"%@{domain}%", repeats)
+        start = time.perf_counter()
+        cache_module.ensure_email_domain_index(conn)
+        index_build_s = time.perf_counter() - start
+        index_ms, index_rows = time_query(conn, cache_module.EMAIL_DOMAIN_QUERY, domain, repeats)
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {cache_module.EMAIL_DOMAIN_QUERY}", (domain,)).fetchall()
+        conn.close()
+
+    print(f"LIKE scan:      {scan_ms:9.2f} ms ({scan_rows} rows)")
+    print(f"Indexed lookup: {index_ms:9.2f} ms ({index_rows} rows), index built in {index_build_s:.2f}s")
+    print(f"Speedup: {scan_ms / index_ms:.0f}x; plan: {plan[0][-1]}")
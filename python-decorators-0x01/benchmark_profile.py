@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Benchmark read/write concurrency with and without the SQLite connection profile.
+
+Reader threads run point lookups while one writer thread updates rows, each
+through with_db_connection, once with SQLite defaults and once with
+DEFAULT_PROFILE. Usage: python benchmark_profile.py [seconds] [readers]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+db_module = __import__('1-with_db_connection')
+
+ROWS = 10000
+
+
+def create_database(path):
+    """Create a users table with ROWS rows."""
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT, age INTEGER)")
+    conn.executemany(
+        "INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
+        ((f"user{i}", f"user{i}@example.com", 18 + i % 60) for i in range(ROWS))
+    )
+    conn.commit()
+    conn.close()
+
+
+def set_user_age(conn, user_id, age):
+    conn.execute("UPDATE users SET age = ? WHERE id = ?", (age, user_id))
+    conn.commit()
+
+
+def run(profile, seconds, readers):
+    """Run the mixed workload and return operation and error counts."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        create_database(path)
+        decorate = db_module.with_db_connection(db_name=path, profile=profile)
+        lookup = decorate(db_module.get_user_by_id.__wrapped__)
+        write = decorate(set_user_age)
+
+        counts = {'reads': 0, 'writes': 0, 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+
+        def worker(kind):
+            done = errors = i = 0
+            while time.perf_counter() < deadline:
+                i += 1
+                try:
+                    if kind == 'reads':
+                        lookup(i % ROWS + 1)
+                    else:
+                        write(i % ROWS + 1, i % 90)
+                    done += 1
+                except sqlite3.OperationalError:
+                    errors += 1
+            with lock:
+                counts[kind] += done
+                counts['errors'] += errors
+
+        threads = [threading.Thread(target=worker, args=('reads',)) for _ in range(readers)]
+        threads.append(threading.Thread(target=worker, args=('writes',)))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        db_module.get_pool(path, profile).close()
+        return counts
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    print(f"=== SQLite profile benchmark: {readers} readers + 1 writer, {seconds}s each ===")
+    for label, profile in [("defaults", None), ("DEFAULT_PROFILE", db_module.DEFAULT_PROFILE)]:
+        counts = run(profile, seconds, readers)
+        print(f"{label:16} reads/s={counts['reads'] / seconds:10.0f} "
+              f"writes/s={counts['writes'] / seconds:8.0f} errors={counts['errors']}")